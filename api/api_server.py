@@ -1,20 +1,200 @@
-from typing import Optional
-import pandas as pd
-from fastapi import FastAPI
+import os
+import time
+import threading
+from contextlib import asynccontextmanager
+from typing import List, Optional
+import polars as pl
+from dotenv import load_dotenv
+from fastapi import FastAPI, Query, Depends, Header, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from src.logger import logger_setup
-from src.utilities import duckdb_setup, ducklake_init
+from src.utilities import duckdb_setup, ducklake_init, INGEST_STATE_TABLE, MODEL_STATE_TABLE
+from src.spatial_index import SpatialIndex
+from src.db_pool import CursorPool
+from src.api_responses import page_response, query_response, execute_arrow, arrow_to_json_frame, negotiate_format, JSON_MEDIA_TYPE, EXPORT_FORMATS
+from src.response_cache import ResponseCache
+from src.search_index import contains_filter, search_index_available
+from src.api_metrics import api_metrics, new_request_stats, timed
 
-app = FastAPI()
 logger = logger_setup("api.log")
+load_dotenv()
 
 DATA_PATH = "data/"
 CATALOG_PATH = "catalog.ducklake"
+API_POOL_SIZE = int(os.getenv("API_POOL_SIZE", 8))
+API_POOL_TIMEOUT = float(os.getenv("API_POOL_TIMEOUT", 30))
+API_DUCKDB_THREADS = int(os.getenv("API_DUCKDB_THREADS", os.cpu_count() or 4))
+API_CACHE_SIZE = int(os.getenv("API_CACHE_SIZE", 512))
+API_CACHE_MAX_BYTES = int(os.getenv("API_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+API_SNAPSHOT_TTL = float(os.getenv("API_SNAPSHOT_TTL", 5))
+API_DEFAULT_PAGE_SIZE = int(os.getenv("API_DEFAULT_PAGE_SIZE", 1000))
+API_MAX_PAGE_SIZE = int(os.getenv("API_MAX_PAGE_SIZE", 10000))
+API_EXPORT_BATCH_ROWS = int(os.getenv("API_EXPORT_BATCH_ROWS", 10000))
+DUCKLAKE_CATALOG = "my_ducklake"
+EXPORT_SCHEMA = "CURATED"
 
-conn = duckdb_setup(read_only=True)
-ducklake_init(conn, DATA_PATH, CATALOG_PATH)
+# Matches the QUALIFY cutoff in sql/curated/PARK_USAGE_TOP_PARKS.SQL
+STATS_MAX_TOP_PARKS = 25
+NEARBY_DEFAULT_RADIUS_MILES = 50
+NEARBY_SOURCES = {
+    "park": """
+        SELECT park_code AS id, name, designation AS detail, states AS state,
+               TRY_CAST(latitude AS DOUBLE) AS latitude, TRY_CAST(longitude AS DOUBLE) AS longitude
+        FROM CURATED.NPS_PARK_PROFILE
+    """,
+    "state_park": """
+        SELECT CAST(id AS VARCHAR) AS id, park_name AS name, city AS detail, state,
+               TRY_CAST(latitude AS DOUBLE) AS latitude, TRY_CAST(longitude AS DOUBLE) AS longitude
+        FROM STAGED.STATE_PARKS
+    """,
+    "landmark": """
+        SELECT CAST(id AS VARCHAR) AS id, property_name AS name, city AS detail, state,
+               TRY_CAST(latitude AS DOUBLE) AS latitude, TRY_CAST(longitude AS DOUBLE) AS longitude
+        FROM CURATED.NATL_LANDMARKS
+        WHERE geocode_precision = 'city'
+    """,
+}
+
+def build_nearby_indexes(cursor):
+    indexes = {}
+    for kind, query in NEARBY_SOURCES.items():
+        try:
+            records = pl.from_arrow(cursor.execute(query).to_arrow_table()).to_dicts()
+            indexes[kind] = SpatialIndex(records)
+            logger.info(f"Loaded {len(indexes[kind])} {kind} locations into the nearby index")
+        except Exception as e:
+            logger.warning(f"Could not load {kind} locations into the nearby index: {e}")
+    return indexes
+
+nearby = {"indexes": {}}
+search_index = {"available": False}
+response_cache = ResponseCache(API_CACHE_SIZE, API_CACHE_MAX_BYTES, API_SNAPSHOT_TTL)
+snapshot_refresh_lock = threading.Lock()
+
+def current_snapshot_id(cursor):
+    return cursor.execute(f"SELECT MAX(snapshot_id) FROM ducklake_snapshots('{DUCKLAKE_CATALOG}')").fetchone()[0]
+
+def refresh_for_snapshot(state, cursor, rebuild):
+    """
+    Re-run rebuild(cursor) when the DuckLake snapshot differs from the one state was last built from,
+    so state derived from the catalog follows a ducklake_sync like the response cache does.
+    """
+    try:
+        snapshot_id = response_cache.snapshot_id(lambda: current_snapshot_id(cursor))
+    except Exception as e:
+        logger.warning(f"Could not read DuckLake snapshot id, keeping the loaded state: {e}")
+        snapshot_id = None
+    if "snapshot_id" in state and state["snapshot_id"] == snapshot_id:
+        return
+    with snapshot_refresh_lock:
+        if "snapshot_id" in state and state["snapshot_id"] == snapshot_id:
+            return
+        rebuild(cursor)
+        state["snapshot_id"] = snapshot_id
+
+def rebuild_nearby_indexes(cursor):
+    nearby["indexes"] = build_nearby_indexes(cursor)
+
+def recheck_search_index(cursor):
+    search_index["available"] = search_index_available(cursor)
+    if not search_index["available"]:
+        logger.warning("Search index tables not found, partial-match filters will scan with LIKE")
+
+def cached_response(request, cursor, build_response):
+    try:
+        snapshot_id = response_cache.snapshot_id(lambda: current_snapshot_id(cursor))
+    except Exception as e:
+        logger.warning(f"Could not read DuckLake snapshot id, serving {request.url.path} uncached: {e}")
+        return build_response()
+    key = (
+        request.url.path,
+        tuple(sorted(request.query_params.multi_items())),
+        negotiate_format(request.headers.get("accept")),
+        snapshot_id,
+    )
+    cached = response_cache.get(key)
+    if cached is not None:
+        body, status_code, headers = cached
+        return Response(content=body, status_code=status_code, headers={**headers, "X-Cache": "HIT"})
+    response = build_response()
+    response_cache.put(key, response.body, response.status_code, dict(response.headers))
+    response.headers["X-Cache"] = "MISS"
+    return response
+
+@asynccontextmanager
+async def lifespan(app):
+    conn = duckdb_setup(read_only=True)
+    ducklake_init(conn, DATA_PATH, CATALOG_PATH)
+    conn.execute(f"SET threads = {API_DUCKDB_THREADS}")
+    app.state.pool = CursorPool(conn, API_POOL_SIZE, catalog=DUCKLAKE_CATALOG, timeout=API_POOL_TIMEOUT)
+    with app.state.pool.cursor() as cursor:
+        refresh_for_snapshot(nearby, cursor, rebuild_nearby_indexes)
+        refresh_for_snapshot(search_index, cursor, recheck_search_index)
+    try:
+        yield
+    finally:
+        nearby.pop("snapshot_id", None)
+        nearby["indexes"] = {}
+        search_index.pop("snapshot_id", None)
+        response_cache.clear()
+        app.state.pool.close()
+
+def add_contains_filter(conditions, params, table_name, column, term):
+    condition, condition_params = contains_filter(table_name, column, term, search_index["available"])
+    conditions.append(condition)
+    params.extend(condition_params)
+
+def get_cursor(request: Request):
+    try:
+        with request.app.state.pool.cursor() as cursor:
+            # Partial-match filters read search_index["available"], so re-check it after each new snapshot
+            refresh_for_snapshot(search_index, cursor, recheck_search_index)
+            yield cursor
+    except TimeoutError as e:
+        logger.error(f"DuckDB cursor pool exhausted: {e}")
+        raise HTTPException(status_code=503, detail=str(e))
+
+app = FastAPI(lifespan=lifespan)
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    stats = new_request_stats()
+    start = time.perf_counter()
+    response = await call_next(request)
+    duration = time.perf_counter() - start
+    route = request.scope.get("route")
+    endpoint = route.path if route else "unmatched"
+    content_length = response.headers.get("content-length")
+    api_metrics.record_request(
+        endpoint,
+        request.method,
+        response.status_code,
+        response.headers.get("x-cache", "none").lower(),
+        duration,
+        stats,
+        int(content_length) if content_length else None
+    )
+    response.headers["Server-Timing"] = ", ".join(
+        f"{stage};dur={stats[f'{stage}_seconds'] * 1000:.2f}" for stage in ("sql", "fetch", "serialize")
+    ) + f", total;dur={duration * 1000:.2f}"
+    return response
+
+@app.get("/metrics", tags=["Monitoring"])
+def get_metrics():
+    """
+    Prometheus text exposition of per-endpoint latency, SQL/fetch/serialize stage times, row counts and payload sizes.
+    """
+    return PlainTextResponse(api_metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/metrics/slow-queries", tags=["Monitoring"])
+def get_slow_queries():
+    """
+    Returns the most recent queries slower than API_SLOW_QUERY_SECONDS, with EXPLAIN ANALYZE plans when API_EXPLAIN_SLOW_QUERIES is enabled.
+    """
+    return list(api_metrics.slow_queries)
 
 @app.get("/landmarks", tags=["Landmarks"])
-def get_all_landmarks(state: Optional[str] = None, city: Optional[str] = None):
+def get_all_landmarks(request: Request, state: Optional[str] = None, city: Optional[str] = None, limit: int = Query(API_DEFAULT_PAGE_SIZE, ge=1, le=API_MAX_PAGE_SIZE), page_cursor: Optional[str] = Query(None, alias="cursor"), accept: Optional[str] = Header(None), cursor=Depends(get_cursor)):
     """
     Returns all landmarks with full details. Optionally filter by state and city (case-insensitive, partial match).
     """
@@ -24,24 +204,23 @@ def get_all_landmarks(state: Optional[str] = None, city: Optional[str] = None):
         params = []
         conditions = []
         if state:
-            conditions.append("(LOWER(state) LIKE ? OR LOWER(state_abbr) LIKE ?)")
-            params.extend([f"%{state.lower()}%", f"%{state.lower()}%"])
+            state_sql, state_params = contains_filter("NATL_LANDMARKS", "state", state, search_index["available"])
+            abbr_sql, abbr_params = contains_filter("NATL_LANDMARKS", "state_abbr", state, search_index["available"])
+            conditions.append(f"({state_sql} OR {abbr_sql})")
+            params.extend(state_params + abbr_params)
         if city:
-            conditions.append("LOWER(city) LIKE ?")
-            params.append(f"%{city.lower()}%")
+            add_contains_filter(conditions, params, "NATL_LANDMARKS", "city", city)
         if conditions:
             query = base_query + " WHERE " + " AND ".join(conditions)
         else:
             query = base_query
-        result = conn.execute(query, params).fetchdf()
-        result = result.replace([pd.NA, pd.NaT, float('nan'), float('inf'), -float('inf')], None)
-        return result.to_dict(orient="records")
+        return cached_response(request, cursor, lambda: page_response(cursor, query, params, [("id", False)], limit, page_cursor, accept))
     except Exception as e:
         logger.error(f"Error in /landmarks endpoint: {e}")
         return {"error": str(e)}
 
 @app.get("/landmarks/summary", tags=["Landmarks"])
-def get_landmarks_summary(state: Optional[str] = None, state_abbr: Optional[str] = None):
+def get_landmarks_summary(request: Request, state: Optional[str] = None, state_abbr: Optional[str] = None, cursor=Depends(get_cursor)):
     """
     Returns summary statistics for landmarks: counts by state, state_abbr, category_of_property, and level_of_significance.
     Optionally filter by state or state_abbr (case-insensitive, partial match).
@@ -50,51 +229,40 @@ def get_landmarks_summary(state: Optional[str] = None, state_abbr: Optional[str]
         params = []
         conditions = []
         if state:
-            conditions.append("LOWER(state) LIKE ?")
-            params.append(f"%{state.lower()}%")
+            add_contains_filter(conditions, params, "NATL_LANDMARKS", "state", state)
         if state_abbr:
-            conditions.append("LOWER(state_abbr) LIKE ?")
-            params.append(f"%{state_abbr.lower()}%")
+            add_contains_filter(conditions, params, "NATL_LANDMARKS", "state_abbr", state_abbr)
         where_clause = ""
         if conditions:
             where_clause = "WHERE " + " AND ".join(conditions)
 
-        state_query = f"""
-            SELECT state, state_abbr, COUNT(*) AS count
-            FROM CURATED.NATL_LANDMARKS
+        query = f"""
+            SELECT summary_level, state, state_abbr, category_of_property, level_of_significance, count
+            FROM CURATED.NATL_LANDMARKS_SUMMARY
             {where_clause}
-            GROUP BY state, state_abbr
-            ORDER BY count DESC
+            ORDER BY CASE WHEN summary_level = 'state' THEN NULL ELSE state END, count DESC
         """
-        category_query = f"""
-            SELECT state, state_abbr, category_of_property, COUNT(*) AS count
-            FROM CURATED.NATL_LANDMARKS
-            {where_clause}
-            GROUP BY state, state_abbr, category_of_property
-            ORDER BY state, count DESC
-        """
-        level_query = f"""
-            SELECT state, state_abbr, level_of_significance, COUNT(*) AS count
-            FROM CURATED.NATL_LANDMARKS
-            {where_clause}
-            GROUP BY state, state_abbr, level_of_significance
-            ORDER BY state, count DESC
-        """
-        state_stats = conn.execute(state_query, params).fetchdf().to_dict(orient="records")
-        category_stats = conn.execute(category_query, params).fetchdf().to_dict(orient="records")
-        level_stats = conn.execute(level_query, params).fetchdf().to_dict(orient="records")
-        return {
-            "by_state": state_stats,
-            "by_category": category_stats,
-            "by_level": level_stats
+        summary_columns = {
+            "by_state": ("state", ["state", "state_abbr", "count"]),
+            "by_category": ("category", ["state", "state_abbr", "category_of_property", "count"]),
+            "by_level": ("level", ["state", "state_abbr", "level_of_significance", "count"]),
         }
+        def build_summary():
+            summary = arrow_to_json_frame(execute_arrow(cursor, query, params))
+            with timed("serialize_seconds"):
+                sections = [
+                    f'"{key}":'.encode() + summary.filter(pl.col("summary_level") == level).select(columns).write_json().encode()
+                    for key, (level, columns) in summary_columns.items()
+                ]
+            return Response(content=b"{" + b",".join(sections) + b"}", media_type=JSON_MEDIA_TYPE)
+        return cached_response(request, cursor, build_summary)
     except Exception as e:
         logger.error(f"Error in /landmarks/summary endpoint: {e}")
         return {"error": str(e)}
 
 
 @app.get("/parks", tags=["National Parks"])
-def get_park_profile(name: Optional[str] = None, park_code: Optional[str] = None, state: Optional[str] = None,  designation: Optional[str] = None):
+def get_park_profile(request: Request, name: Optional[str] = None, park_code: Optional[str] = None, state: Optional[str] = None,  designation: Optional[str] = None, limit: int = Query(API_DEFAULT_PAGE_SIZE, ge=1, le=API_MAX_PAGE_SIZE), page_cursor: Optional[str] = Query(None, alias="cursor"), accept: Optional[str] = Header(None), cursor=Depends(get_cursor)):
     """
     Returns park profile information, optionally filtered by park name and/or national designation (case-insensitive, partial match).
     """
@@ -104,31 +272,26 @@ def get_park_profile(name: Optional[str] = None, park_code: Optional[str] = None
         params = []
         conditions = []
         if name:
-            conditions.append("LOWER(name) LIKE ?")
-            params.append(f"%{name.lower()}%")
+            add_contains_filter(conditions, params, "NPS_PARK_PROFILE", "name", name)
         if park_code:
-            conditions.append("LOWER(park_code) LIKE ?")
-            params.append(f"%{park_code.lower()}%")
+            add_contains_filter(conditions, params, "NPS_PARK_PROFILE", "park_code", park_code)
         if state:
-            conditions.append("LOWER(states) LIKE ?")
-            params.append(f"%{state.lower()}%")
+            add_contains_filter(conditions, params, "NPS_PARK_PROFILE", "states", state)
         if designation:
-            conditions.append("LOWER(designation) LIKE ?")
-            params.append(f"%{designation.lower()}%")
+            add_contains_filter(conditions, params, "NPS_PARK_PROFILE", "designation", designation)
         if conditions:
             query = base_query + " WHERE " + " AND ".join(conditions)
         else:
             query = base_query
-        result = conn.execute(query, params).fetchdf()
         logger.info(f"/park_profile query: {query} params: {params}")
-        return result.to_dict(orient="records")
+        return cached_response(request, cursor, lambda: page_response(cursor, query, params, [("park_code", False)], limit, page_cursor, accept))
     except Exception as e:
         logger.error(f"Error in /park_profile endpoint: {e}")
         return {"error": str(e)}
     
 
 @app.get("/parks/alerts", tags=["National Parks"])
-def get_park_alerts(park_name: Optional[str] = None, category: Optional[str] = None):
+def get_park_alerts(request: Request, park_name: Optional[str] = None, category: Optional[str] = None, limit: int = Query(API_DEFAULT_PAGE_SIZE, ge=1, le=API_MAX_PAGE_SIZE), page_cursor: Optional[str] = Query(None, alias="cursor"), accept: Optional[str] = Header(None), cursor=Depends(get_cursor)):
     """
     Returns park alerts, optionally filtered by park name and alert category (case-insensitive, partial match).
     """
@@ -136,29 +299,20 @@ def get_park_alerts(park_name: Optional[str] = None, category: Optional[str] = N
     try:
         base_query = "SELECT * FROM CURATED.PARK_ALERTS"
         params = []
-        conditions = []
+        conditions = ["alert_title IS NOT NULL"]
         if park_name:
-            conditions.append("LOWER(park_name) LIKE ?")
-            params.append(f"%{park_name.lower()}%")
+            add_contains_filter(conditions, params, "PARK_ALERTS", "park_name", park_name)
         if category:
-            conditions.append("LOWER(alert_category) LIKE ?")
-            params.append(f"%{category.lower()}%")
-        if conditions:
-            query = base_query + " WHERE " + " AND ".join(conditions)
-        else:
-            query = base_query
-        result = conn.execute(query, params).fetchdf()
-        # Filter out alerts where alert_title is null
-        if "alert_title" in result.columns:
-            result = result[result["alert_title"].notnull()]
+            add_contains_filter(conditions, params, "PARK_ALERTS", "alert_category", category)
+        query = base_query + " WHERE " + " AND ".join(conditions)
         logger.info(f"/parks/alerts query: {query} params: {params}")
-        return result.to_dict(orient="records")
+        return cached_response(request, cursor, lambda: page_response(cursor, query, params, [("park_code", False), ("alert_id", False)], limit, page_cursor, accept))
     except Exception as e:
         logger.error(f"Error in /parks/alerts endpoint: {e}")
         return {"error": str(e)}
 
 @app.get("/parks/distances", tags=["National Parks"])
-def get_nps_distances(starting_national_park: Optional[str] = None):
+def get_nps_distances(request: Request, starting_national_park: Optional[str] = None, limit: int = Query(API_DEFAULT_PAGE_SIZE, ge=1, le=API_MAX_PAGE_SIZE), page_cursor: Optional[str] = Query(None, alias="cursor"), accept: Optional[str] = Header(None), cursor=Depends(get_cursor)):
     """
     Finds the distances between national parks.
     Optionally filter by starting national park (case-insensitive, partial match).
@@ -166,20 +320,20 @@ def get_nps_distances(starting_national_park: Optional[str] = None):
     logger.info(f"/parks/distances called with starting_national_park={starting_national_park}")
     try:
         if starting_national_park:
-            query = "SELECT * FROM CURATED.NPS_DISTANCES WHERE LOWER(starting_national_park) LIKE ?"
-            param = f"%{starting_national_park.lower()}%"
-            result = conn.execute(query, [param]).fetchdf()
+            condition, params = contains_filter("NPS_DISTANCES", "starting_national_park", starting_national_park, search_index["available"])
+            query = f"SELECT * FROM CURATED.NPS_DISTANCES WHERE {condition}"
         else:
             query = "SELECT * FROM CURATED.NPS_DISTANCES"
-            result = conn.execute(query).fetchdf()
+            params = []
         logger.info(f"/parks/distances query: {query}")
-        return result.to_dict(orient="records")
+        return cached_response(request, cursor, lambda: page_response(cursor, query, params, [("starting_park_code", False), ("distance_miles", False), ("destination_park_code", False)], limit, page_cursor, accept))
     except Exception as e:
         logger.error(f"Error in /parks/distances endpoint: {e}")
         return {"error": str(e)}
     
 @app.get("/parks/landmarks", tags=["National Parks"])
 def get_nps_parks_to_landmarks(
+    request: Request,
     park_name: Optional[str] = None,
     property_name: Optional[str] = None,
     landmark_city: Optional[str] = None,
@@ -188,50 +342,42 @@ def get_nps_parks_to_landmarks(
     level_of_significance: Optional[str] = None,        
     area_of_significance: Optional[str] = None,          
     category_of_property: Optional[str] = None,     
-    limit: int = 5000,
-    offset: int = 0
+    limit: int = Query(API_DEFAULT_PAGE_SIZE, ge=1, le=API_MAX_PAGE_SIZE),
+    page_cursor: Optional[str] = Query(None, alias="cursor"),
+    accept: Optional[str] = Header(None),
+    cursor=Depends(get_cursor)
 ):
     """
     Finds parks and their associated landmarks, with optional filters for park name, property name, city, county, and state, as well as area of significance, level of significance, and category of property (all case-insensitive, partial match).
-    Supports pagination with limit and offset.
+    Paginated like every list endpoint: pass the X-Next-Cursor response header back as cursor to get the next page.
     """
-    logger.info(f"/parks/landmarks called with park_name={park_name}, property_name={property_name}, landmark_city={landmark_city}, landmark_county={landmark_county}, landmark_state={landmark_state}, level_of_significance={level_of_significance}, area_of_significance={area_of_significance}, category_of_property={category_of_property}, limit={limit}, offset={offset}")
+    logger.info(f"/parks/landmarks called with park_name={park_name}, property_name={property_name}, landmark_city={landmark_city}, landmark_county={landmark_county}, landmark_state={landmark_state}, level_of_significance={level_of_significance}, area_of_significance={area_of_significance}, category_of_property={category_of_property}, limit={limit}, cursor={page_cursor}")
     try:
-        base_query = "SELECT park_name, property_name AS nearby_landmark, landmark_address AS address, landmark_city AS city, landmark_county AS county, landmark_state AS state, listed_date, level_of_significance, area_of_significance, category_of_property FROM CURATED.NPS_PARKS_TO_LANDMARKS"
+        base_query = "SELECT park_code, landmark_id, park_name, property_name AS nearby_landmark, landmark_address AS address, landmark_city AS city, landmark_county AS county, landmark_state AS state, listed_date, level_of_significance, area_of_significance, category_of_property FROM CURATED.NPS_PARKS_TO_LANDMARKS"
         params = []
         conditions = []
         if park_name:
-            conditions.append("LOWER(park_name) LIKE ?")
-            params.append(f"%{park_name.lower()}%")
+            add_contains_filter(conditions, params, "NPS_PARKS_TO_LANDMARKS", "park_name", park_name)
         if property_name:
-            conditions.append("LOWER(property_name) LIKE ?")
-            params.append(f"%{property_name.lower()}%")
+            add_contains_filter(conditions, params, "NPS_PARKS_TO_LANDMARKS", "property_name", property_name)
         if landmark_city:
-            conditions.append("LOWER(landmark_city) LIKE ?")
-            params.append(f"%{landmark_city.lower()}%")
+            add_contains_filter(conditions, params, "NPS_PARKS_TO_LANDMARKS", "landmark_city", landmark_city)
         if landmark_county:
-            conditions.append("LOWER(landmark_county) LIKE ?")
-            params.append(f"%{landmark_county.lower()}%")
+            add_contains_filter(conditions, params, "NPS_PARKS_TO_LANDMARKS", "landmark_county", landmark_county)
         if landmark_state:
-            conditions.append("LOWER(landmark_state) LIKE ?")
-            params.append(f"%{landmark_state.lower()}%")
+            add_contains_filter(conditions, params, "NPS_PARKS_TO_LANDMARKS", "landmark_state", landmark_state)
         if level_of_significance:
-            conditions.append("LOWER(level_of_significance) LIKE ?")
-            params.append(f"%{level_of_significance.lower()}%")
+            add_contains_filter(conditions, params, "NPS_PARKS_TO_LANDMARKS", "level_of_significance", level_of_significance)
         if area_of_significance:
-            conditions.append("LOWER(area_of_significance) LIKE ?")
-            params.append(f"%{area_of_significance.lower()}%")
+            add_contains_filter(conditions, params, "NPS_PARKS_TO_LANDMARKS", "area_of_significance", area_of_significance)
         if category_of_property:
-            conditions.append("LOWER(category_of_property) LIKE ?")
-            params.append(f"%{category_of_property.lower()}%")
+            add_contains_filter(conditions, params, "NPS_PARKS_TO_LANDMARKS", "category_of_property", category_of_property)
         if conditions:
             query = base_query + " WHERE " + " AND ".join(conditions)
         else:
             query = base_query
-        query += f" LIMIT {limit} OFFSET {offset}"
-        result = conn.execute(query, params).fetchdf()
         logger.info(f"/parks/landmarks query: {query} params: {params}")
-        return result.to_dict(orient="records")
+        return cached_response(request, cursor, lambda: page_response(cursor, query, params, [("park_code", False), ("landmark_id", False)], limit, page_cursor, accept))
     except Exception as e:
         logger.error(f"Error in /parks/landmarks endpoint: {e}")
         return {"error": str(e)}
@@ -239,68 +385,84 @@ def get_nps_parks_to_landmarks(
 
 @app.get("/parks/usage", tags=["National Parks"])
 def get_park_usage(
+    request: Request,
     park_name: Optional[str] = None,
+    park_code: Optional[List[str]] = Query(None),
     year: Optional[int] = None,
+    year_from: Optional[int] = None,
+    year_to: Optional[int] = None,
     month: Optional[int] = None,
     granularity: str = "annual",
-    aggregate: Optional[bool] = False
+    aggregate: Optional[bool] = False,
+    limit: int = Query(API_DEFAULT_PAGE_SIZE, ge=1, le=API_MAX_PAGE_SIZE),
+    page_cursor: Optional[str] = Query(None, alias="cursor"),
+    accept: Optional[str] = Header(None),
+    cursor=Depends(get_cursor)
 ):
     """
     Returns park usage statistics with flexible granularity (annual or monthly).
-    Optionally filter by park name, year, month, and aggregate totals for all parks.
+    Optionally filter by park name, year or year range (inclusive), month, and aggregate totals for all parks.
+    Monthly usage can also be limited to exact park codes (repeat park_code for several parks) and only
+    includes rows with a valid year, month and recreation visit count. park_code with any other granularity returns 422.
     """
-    logger.info(f"/parks/usage called with park_name={park_name}, year={year}, month={month}, granularity={granularity}, aggregate={aggregate}")
+    logger.info(f"/parks/usage called with park_name={park_name}, park_code={park_code}, year={year}, year_from={year_from}, year_to={year_to}, month={month}, granularity={granularity}, aggregate={aggregate}")
+    if park_code and granularity != "monthly":
+        raise HTTPException(status_code=422, detail="park_code only filters monthly usage; pass granularity=monthly.")
     try:
+        usage_table = "NPS_PARK_USAGE_ANNUAL" if granularity == "monthly" else "PARK_USAGE_SUMMARIZED"
         params = []
         conditions = []
         if park_name:
-            conditions.append("LOWER(park_name) LIKE ?")
-            params.append(f"%{park_name.lower()}%")
+            add_contains_filter(conditions, params, usage_table, "park_name", park_name)
         if year:
             conditions.append("year = ?")
             params.append(year)
+        if year_from:
+            conditions.append("year >= ?")
+            params.append(year_from)
+        if year_to:
+            conditions.append("year <= ?")
+            params.append(year_to)
         if granularity == "monthly" and month:
             conditions.append("month = ?")
             params.append(month)
+        if park_code:
+            conditions.append(f"park_code IN ({', '.join('?' for _ in park_code)})")
+            params.extend(park_code)
         if granularity == "monthly":
+            # Parks without usage come through the LEFT JOIN as NULL rows; BETWEEN also drops 0 and NaN
+            conditions.append("Year BETWEEN 1 AND 9999 AND Month BETWEEN 1 AND 12 AND RecreationVisits IS NOT NULL")
             base_query = "SELECT * FROM CURATED.NPS_PARK_USAGE_ANNUAL"
             if conditions:
                 query = base_query + " WHERE " + " AND ".join(conditions)
             else:
                 query = base_query
-            result = conn.execute(query, params).fetchdf()
             logger.info(f"/parks/usage monthly query: {query} params: {params}")
-            return result.to_dict(orient="records")
+            return cached_response(request, cursor, lambda: page_response(cursor, query, params, [("park_id", False), ("Year", False), ("Month", False)], limit, page_cursor, accept))
         elif granularity == "annual":
             if aggregate and not park_name:
                 where_clause = " WHERE " + " AND ".join(conditions) if conditions else ""
                 query = f"""
                     SELECT year,
-                           SUM(total_recreation_visits) AS total_recreation_visits,
-                           SUM(total_non_recreation_visits) AS total_non_recreation_visits,
-                           SUM(total_concessioner_camping) AS total_concessioner_camping,
-                           SUM(total_tent_campers) AS total_tent_campers,
-                           SUM(total_rv_campers) AS total_rv_campers
+                           COALESCE(SUM(total_recreation_visits), 0) AS total_recreation_visits,
+                           COALESCE(SUM(total_non_recreation_visits), 0) AS total_non_recreation_visits,
+                           COALESCE(SUM(total_concessioner_camping), 0) AS total_concessioner_camping,
+                           COALESCE(SUM(total_tent_campers), 0) AS total_tent_campers,
+                           COALESCE(SUM(total_rv_campers), 0) AS total_rv_campers
                     FROM CURATED.PARK_USAGE_SUMMARIZED
                     {where_clause}
                     GROUP BY year
-                    ORDER BY year
                 """
-                result = conn.execute(query, params).fetchdf()
                 logger.info(f"/parks/usage annual aggregate query: {query} params: {params}")
-                result = result.fillna(0)
-                return result.to_dict(orient="records")
+                return cached_response(request, cursor, lambda: page_response(cursor, query, params, [("year", False)], limit, page_cursor, accept))
             else:
                 base_query = "SELECT * FROM CURATED.PARK_USAGE_SUMMARIZED"
                 if conditions:
                     query = base_query + " WHERE " + " AND ".join(conditions)
                 else:
                     query = base_query
-                query += " ORDER BY total_recreation_visits DESC"
-                result = conn.execute(query, params).fetchdf()
                 logger.info(f"/parks/usage annual query: {query} params: {params}")
-                result = result.replace([pd.NA, pd.NaT, float('nan'), float('inf'), -float('inf')], None)
-                return result.to_dict(orient="records")
+                return cached_response(request, cursor, lambda: page_response(cursor, query, params, [("total_recreation_visits", True), ("park_id", False), ("Year", False)], limit, page_cursor, accept))
         else:
             return {"error": "Invalid granularity. Use 'annual' or 'monthly'."}
     except Exception as e:
@@ -308,7 +470,7 @@ def get_park_usage(
         return {"error": str(e)}
 
 @app.get("/parks/state-distances", tags=["National Parks"])
-def get_nps_to_state_distance(national_park_name: Optional[str] = None, state_park_name: Optional[str] = None):
+def get_nps_to_state_distance(request: Request, national_park_name: Optional[str] = None, state_park_name: Optional[str] = None, limit: int = Query(API_DEFAULT_PAGE_SIZE, ge=1, le=API_MAX_PAGE_SIZE), page_cursor: Optional[str] = Query(None, alias="cursor"), accept: Optional[str] = Header(None), cursor=Depends(get_cursor)):
     """
     Returns distances from national parks to state parks.
     Optionally filter by national park name and state park name (case-insensitive, partial match).
@@ -319,18 +481,153 @@ def get_nps_to_state_distance(national_park_name: Optional[str] = None, state_pa
         params = []
         conditions = []
         if national_park_name:
-            conditions.append("LOWER(national_park_name) LIKE ?")
-            params.append(f"%{national_park_name.lower()}%")
+            add_contains_filter(conditions, params, "NPS_TO_STATE_DISTANCE", "national_park_name", national_park_name)
         if state_park_name:
-            conditions.append("LOWER(state_park_name) LIKE ?")
-            params.append(f"%{state_park_name.lower()}%")
+            add_contains_filter(conditions, params, "NPS_TO_STATE_DISTANCE", "state_park_name", state_park_name)
         if conditions:
             query = base_query + " WHERE " + " AND ".join(conditions)
         else:
             query = base_query
-        result = conn.execute(query, params).fetchdf()
         logger.info(f"/parks/state-distances query: {query} params: {params}")
-        return result.to_dict(orient="records")
+        return cached_response(request, cursor, lambda: page_response(cursor, query, params, [("national_park_code", False), ("distance_miles", False), ("state_park_id", False)], limit, page_cursor, accept))
     except Exception as e:
         logger.error(f"Error in /parks/state-distances endpoint: {e}")
-        return {"error": str(e)}
\ No newline at end of file
+        return {"error": str(e)}
+
+@app.get("/stats/yoy", tags=["Stats"])
+def get_usage_yoy(request: Request, year_from: Optional[int] = None, year_to: Optional[int] = None, accept: Optional[str] = Header(None), cursor=Depends(get_cursor)):
+    """
+    Returns visitor totals across all parks per year, with the previous year's recreation visits and the percent change.
+    Optionally limit to a year range (inclusive).
+    """
+    logger.info(f"/stats/yoy called with year_from={year_from}, year_to={year_to}")
+    try:
+        params = []
+        conditions = []
+        if year_from:
+            conditions.append("Year >= ?")
+            params.append(year_from)
+        if year_to:
+            conditions.append("Year <= ?")
+            params.append(year_to)
+        where_clause = " WHERE " + " AND ".join(conditions) if conditions else ""
+        query = f"SELECT * FROM CURATED.PARK_USAGE_YEARLY{where_clause} ORDER BY Year"
+        return cached_response(request, cursor, lambda: query_response(cursor, query, params, accept))
+    except Exception as e:
+        logger.error(f"Error in /stats/yoy endpoint: {e}")
+        return {"error": str(e)}
+
+@app.get("/stats/top-parks", tags=["Stats"])
+def get_top_parks(request: Request, year: Optional[int] = None, n: int = Query(5, ge=1, le=STATS_MAX_TOP_PARKS), accept: Optional[str] = Header(None), cursor=Depends(get_cursor)):
+    """
+    Returns the n parks with the most recreation visits in a year (default: the latest year with usage data), ranked.
+    """
+    logger.info(f"/stats/top-parks called with year={year}, n={n}")
+    try:
+        if year:
+            year_condition = "Year = ?"
+            params = [year, n]
+        else:
+            year_condition = "Year = (SELECT MAX(Year) FROM CURATED.PARK_USAGE_TOP_PARKS)"
+            params = [n]
+        query = f"SELECT * FROM CURATED.PARK_USAGE_TOP_PARKS WHERE {year_condition} AND visit_rank <= ? ORDER BY visit_rank"
+        return cached_response(request, cursor, lambda: query_response(cursor, query, params, accept))
+    except Exception as e:
+        logger.error(f"Error in /stats/top-parks endpoint: {e}")
+        return {"error": str(e)}
+
+@app.get("/stats/parks-by-state", tags=["Stats"])
+def get_parks_by_state(request: Request, accept: Optional[str] = Header(None), cursor=Depends(get_cursor)):
+    """
+    Returns the number of national parks in each state. Parks spanning several states count toward each of them.
+    """
+    try:
+        query = "SELECT state, num_parks FROM CURATED.PARKS_BY_STATE ORDER BY num_parks DESC, state"
+        return cached_response(request, cursor, lambda: query_response(cursor, query, [], accept))
+    except Exception as e:
+        logger.error(f"Error in /stats/parks-by-state endpoint: {e}")
+        return {"error": str(e)}
+
+@app.get("/nearby", tags=["Nearby"])
+def get_nearby(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius: Optional[float] = Query(None, gt=0),
+    kind: str = "all",
+    k: Optional[int] = Query(None, ge=1, le=API_MAX_PAGE_SIZE),
+    cursor=Depends(get_cursor)
+):
+    """
+    Returns national parks, state parks and landmarks near a point, nearest first, with distance_miles.
+    Pass radius (miles) for everything within that distance (capped at the max page size), k for the k nearest, or both for the k nearest within radius.
+    Filter by kind: park, state_park, landmark or all. Only landmarks geocoded to their city are included; state-level placements are too coarse for distances.
+    The indexes are rebuilt from the catalog after each new DuckLake snapshot.
+    """
+    logger.info(f"/nearby called with lat={lat}, lon={lon}, radius={radius}, kind={kind}, k={k}")
+    try:
+        refresh_for_snapshot(nearby, cursor, rebuild_nearby_indexes)
+        nearby_indexes = nearby["indexes"]
+        if kind == "all":
+            kinds = list(nearby_indexes)
+        elif kind in NEARBY_SOURCES:
+            if kind not in nearby_indexes:
+                return {"error": f"Nearby index for '{kind}' is not available."}
+            kinds = [kind]
+        else:
+            return {"error": f"Invalid kind. Use one of: all, {', '.join(NEARBY_SOURCES)}."}
+        if radius is None and k is None:
+            radius = NEARBY_DEFAULT_RADIUS_MILES
+        matches = []
+        for index_kind in kinds:
+            index = nearby_indexes[index_kind]
+            if k is None:
+                found = index.within(lat, lon, radius, limit=API_MAX_PAGE_SIZE)
+            else:
+                found = index.nearest(lat, lon, k, max_radius_miles=radius)
+            matches.extend((distance, index_kind, record) for record, distance in found)
+        matches.sort(key=lambda match: match[0])
+        matches = matches[:k or API_MAX_PAGE_SIZE]
+        return [
+            {"kind": index_kind, **record, "distance_miles": round(distance, 2)}
+            for distance, index_kind, record in matches
+        ]
+    except Exception as e:
+        logger.error(f"Error in /nearby endpoint: {e}")
+        return {"error": str(e)}
+
+def get_exportable_tables(cursor):
+    rows = cursor.execute(
+        "SELECT table_name FROM information_schema.tables WHERE table_catalog = current_database() AND table_schema = ?",
+        [EXPORT_SCHEMA]
+    ).fetchall()
+    return {row[0].upper(): row[0] for row in rows if row[0].upper() not in (INGEST_STATE_TABLE, MODEL_STATE_TABLE)}
+
+def stream_table_export(pool, table_name, stream_format):
+    with pool.cursor() as cursor:
+        reader = cursor.execute(f'SELECT * FROM {EXPORT_SCHEMA}."{table_name}"').to_arrow_reader(API_EXPORT_BATCH_ROWS)
+        yield from stream_format(reader)
+
+@app.get("/export/{table_name}", tags=["Export"])
+def export_table(request: Request, table_name: str, format: str = "ndjson"):
+    """
+    Streams a whole curated table as NDJSON (default), CSV or Parquet, one record batch at a time.
+    Rows start flowing immediately and server memory stays flat regardless of table size.
+    """
+    logger.info(f"/export called with table_name={table_name}, format={format}")
+    try:
+        if format not in EXPORT_FORMATS:
+            return {"error": f"Invalid format. Use one of: {', '.join(EXPORT_FORMATS)}."}
+        with request.app.state.pool.cursor() as cursor:
+            tables = get_exportable_tables(cursor)
+        if table_name.upper() not in tables:
+            return {"error": f"Unknown table '{table_name}'. Exportable tables: {', '.join(sorted(tables.values()))}."}
+        stream_format, media_type = EXPORT_FORMATS[format]
+        table = tables[table_name.upper()]
+        return StreamingResponse(
+            stream_table_export(request.app.state.pool, table, stream_format),
+            media_type=media_type,
+            headers={"Content-Disposition": f'attachment; filename="{table.lower()}.{format}"'}
+        )
+    except Exception as e:
+        logger.error(f"Error in /export endpoint: {e}")
+        return {"error": str(e)}
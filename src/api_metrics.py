@@ -0,0 +1,108 @@
+import time
+import threading
+import contextvars
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000, 1000000)
+BYTE_BUCKETS = (256, 1024, 16384, 131072, 1048576, 8388608, 67108864)
+
+current_stats = contextvars.ContextVar("api_request_stats", default=None)
+
+
+def new_request_stats():
+    stats = {"sql_seconds": 0.0, "fetch_seconds": 0.0, "serialize_seconds": 0.0, "rows": 0, "queries": 0}
+    current_stats.set(stats)
+    return stats
+
+
+def add_stat(name, value):
+    stats = current_stats.get()
+    if stats is not None:
+        stats[name] += value
+
+
+@contextmanager
+def timed(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_stat(name, time.perf_counter() - start)
+
+
+class Histogram:
+    """
+    Minimal thread-safe Prometheus histogram keyed by label values.
+    """
+
+    def __init__(self, name, help_text, label_names, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series_items = sorted((labels, [list(s[0]), s[1], s[2]]) for labels, s in self._series.items())
+        for label_values, (counts, total, count) in series_items:
+            labels = ",".join(f'{name}="{escape_label(value)}"' for name, value in zip(self.label_names, label_values))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f"{self.name}_sum{{{labels}}} {total}")
+            lines.append(f"{self.name}_count{{{labels}}} {count}")
+        return "\n".join(lines)
+
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class ApiMetrics:
+    def __init__(self, slow_query_limit=50):
+        self.request_seconds = Histogram(
+            "nomadiq_api_request_seconds", "End-to-end request latency.", ("endpoint", "method", "status", "cache"), LATENCY_BUCKETS
+        )
+        self.stage_seconds = Histogram(
+            "nomadiq_api_stage_seconds", "Time spent per request in SQL execution, Arrow fetch/convert and serialization.",
+            ("endpoint", "stage"), LATENCY_BUCKETS
+        )
+        self.response_rows = Histogram("nomadiq_api_response_rows", "Rows returned per request.", ("endpoint",), ROW_BUCKETS)
+        self.response_bytes = Histogram("nomadiq_api_response_bytes", "Response payload size in bytes.", ("endpoint",), BYTE_BUCKETS)
+        self.slow_queries = deque(maxlen=slow_query_limit)
+
+    def record_request(self, endpoint, method, status, cache, duration, stats, payload_bytes):
+        self.request_seconds.observe(duration, endpoint, method, str(status), cache)
+        for stage in ("sql", "fetch", "serialize"):
+            self.stage_seconds.observe(stats[f"{stage}_seconds"], endpoint, stage)
+        if stats["queries"]:
+            self.response_rows.observe(stats["rows"], endpoint)
+        if payload_bytes is not None:
+            self.response_bytes.observe(payload_bytes, endpoint)
+
+    def record_slow_query(self, entry):
+        self.slow_queries.append(entry)
+
+    def render(self):
+        histograms = (self.request_seconds, self.stage_seconds, self.response_rows, self.response_bytes)
+        return "\n".join(histogram.render() for histogram in histograms) + "\n"
+
+
+api_metrics = ApiMetrics()
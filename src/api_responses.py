@@ -0,0 +1,180 @@
+import io
+import os
+import time
+import duckdb
+import polars as pl
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+from fastapi import Response
+from src.logger import logger_setup
+from src.pagination import paginate_query, split_page
+from src.api_metrics import api_metrics, add_stat, timed
+
+logger = logger_setup("api.log")
+
+API_SLOW_QUERY_SECONDS = float(os.getenv("API_SLOW_QUERY_SECONDS", 1.0))
+API_EXPLAIN_SLOW_QUERIES = os.getenv("API_EXPLAIN_SLOW_QUERIES", "false").lower() == "true"
+
+JSON_MEDIA_TYPE = "application/json"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+PARQUET_MEDIA_TYPE = "application/vnd.apache.parquet"
+PARQUET_MEDIA_TYPES = (PARQUET_MEDIA_TYPE, "application/x-parquet")
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+CSV_MEDIA_TYPE = "text/csv"
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def negotiate_format(accept):
+    accept = (accept or "").lower()
+    if ARROW_MEDIA_TYPE in accept:
+        return "arrow"
+    if any(media_type in accept for media_type in PARQUET_MEDIA_TYPES):
+        return "parquet"
+    return "json"
+
+
+def arrow_to_json_frame(table):
+    df = pl.from_arrow(table)
+    if not isinstance(df, pl.DataFrame):
+        df = df.to_frame()
+    casts = [
+        pl.col(name).cast(pl.Int64 if dtype.scale == 0 and dtype.precision <= 18 else pl.Float64)
+        for name, dtype in df.schema.items()
+        if isinstance(dtype, pl.Decimal)
+    ]
+    if casts:
+        df = df.with_columns(casts)
+    return df
+
+
+def arrow_to_json_bytes(table):
+    return arrow_to_json_frame(table).write_json().encode()
+
+
+def arrow_to_ipc_bytes(table):
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def arrow_to_parquet_bytes(table):
+    sink = pa.BufferOutputStream()
+    pq.write_table(table, sink)
+    return sink.getvalue().to_pybytes()
+
+
+def arrow_response(table, accept=None):
+    output_format = negotiate_format(accept)
+    with timed("serialize_seconds"):
+        if output_format == "arrow":
+            return Response(content=arrow_to_ipc_bytes(table), media_type=ARROW_MEDIA_TYPE)
+        if output_format == "parquet":
+            return Response(content=arrow_to_parquet_bytes(table), media_type=PARQUET_MEDIA_TYPE)
+        return Response(content=arrow_to_json_bytes(table), media_type=JSON_MEDIA_TYPE)
+
+
+def explain_analyze(cursor, query, params):
+    try:
+        return "\n".join(row[-1] for row in cursor.execute(f"EXPLAIN ANALYZE {query}", params).fetchall())
+    except duckdb.Error as e:
+        return f"EXPLAIN ANALYZE failed: {e}"
+
+
+def execute_arrow(cursor, query, params=None):
+    params = params or []
+    start = time.perf_counter()
+    result = cursor.execute(query, params)
+    sql_seconds = time.perf_counter() - start
+    add_stat("sql_seconds", sql_seconds)
+    with timed("fetch_seconds"):
+        table = result.to_arrow_table()
+    add_stat("rows", table.num_rows)
+    add_stat("queries", 1)
+    if sql_seconds >= API_SLOW_QUERY_SECONDS:
+        plan = explain_analyze(cursor, query, params) if API_EXPLAIN_SLOW_QUERIES else None
+        logger.warning(f"Slow query ({sql_seconds:.3f}s, {table.num_rows} rows): {query} params: {params}" + (f"\n{plan}" if plan else ""))
+        api_metrics.record_slow_query({
+            "sql": query,
+            "params": [str(param) for param in params],
+            "sql_seconds": round(sql_seconds, 4),
+            "rows": table.num_rows,
+            "plan": plan,
+        })
+    return table
+
+
+def query_response(cursor, query, params=None, accept=None):
+    return arrow_response(execute_arrow(cursor, query, params), accept)
+
+
+def page_response(cursor, query, params, sort_keys, limit, page_cursor=None, accept=None):
+    page_query, page_params = paginate_query(query, params or [], sort_keys, limit, page_cursor)
+    table = execute_arrow(cursor, page_query, page_params)
+    page, next_cursor = split_page(table, sort_keys, limit)
+    response = arrow_response(page, accept)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return response
+
+
+class _ChunkSink(io.RawIOBase):
+    # Write-only file that hands written bytes back to a generator while keeping the
+    # absolute position, which the Parquet writer needs for its footer offsets
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_ndjson(reader):
+    for batch in reader:
+        if batch.num_rows:
+            yield arrow_to_json_frame(pa.Table.from_batches([batch])).write_ndjson().encode()
+
+
+def stream_csv(reader):
+    include_header = True
+    for batch in reader:
+        sink = pa.BufferOutputStream()
+        pa_csv.write_csv(batch, sink, pa_csv.WriteOptions(include_header=include_header))
+        include_header = False
+        yield sink.getvalue().to_pybytes()
+    if include_header:
+        sink = pa.BufferOutputStream()
+        pa_csv.write_csv(reader.schema.empty_table(), sink)
+        yield sink.getvalue().to_pybytes()
+
+
+def stream_parquet(reader):
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, reader.schema) as writer:
+        for batch in reader:
+            writer.write_batch(batch)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    yield sink.drain()
+
+
+EXPORT_FORMATS = {
+    "ndjson": (stream_ndjson, NDJSON_MEDIA_TYPE),
+    "csv": (stream_csv, CSV_MEDIA_TYPE),
+    "parquet": (stream_parquet, PARQUET_MEDIA_TYPE),
+}
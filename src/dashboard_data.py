@@ -0,0 +1,83 @@
+import os
+import threading
+import requests
+import streamlit as st
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+API_URL = os.getenv("NOMADIQ_API_URL", "http://localhost:8000")
+API_PAGE_SIZE = int(os.getenv("API_MAX_PAGE_SIZE", 10000))
+DASHBOARD_CACHE_TTL = int(os.getenv("DASHBOARD_CACHE_TTL", 600))
+DASHBOARD_PREFETCH_WORKERS = int(os.getenv("DASHBOARD_PREFETCH_WORKERS", 6))
+
+
+@st.cache_resource
+def get_api_session():
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=DASHBOARD_PREFETCH_WORKERS, pool_maxsize=DASHBOARD_PREFETCH_WORKERS)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+@st.cache_data(ttl=DASHBOARD_CACHE_TTL, show_spinner=False)
+def get_json(path, params=None):
+    """
+    Fetch a single API response, cached per path and parameters.
+    Raises on a failed response or an error payload so the failure is never cached.
+    """
+    resp = get_api_session().get(f"{API_URL}{path}", params=params)
+    resp.raise_for_status()
+    payload = resp.json()
+    if isinstance(payload, dict) and "error" in payload:
+        raise ValueError(f"{path} returned an error: {payload['error']}")
+    return payload
+
+
+@st.cache_data(ttl=DASHBOARD_CACHE_TTL, show_spinner=False)
+def get_all_pages(path, params=None):
+    """
+    Fetch every page of a list endpoint by following the X-Next-Cursor response header, cached per path and parameters.
+    Raises on a failed or non-list page so a partial result is never cached.
+    """
+    session = get_api_session()
+    params = {"limit": API_PAGE_SIZE, **(params or {})}
+    rows = []
+    while True:
+        resp = session.get(f"{API_URL}{path}", params=params)
+        resp.raise_for_status()
+        page = resp.json()
+        if not isinstance(page, list):
+            raise ValueError(f"{path} returned {page} instead of a page of rows")
+        rows.extend(page)
+        next_cursor = resp.headers.get("X-Next-Cursor")
+        if not next_cursor:
+            return rows
+        params["cursor"] = next_cursor
+
+
+def prefetch(list_requests=(), json_requests=()):
+    """Warm the cache for independent endpoints concurrently so the page renders from cache."""
+    ctx = get_script_run_ctx()
+
+    def attach_context():
+        add_script_run_ctx(threading.current_thread(), ctx)
+
+    with ThreadPoolExecutor(max_workers=DASHBOARD_PREFETCH_WORKERS, initializer=attach_context) as executor:
+        futures = [executor.submit(get_all_pages, path, params) for path, params in list_requests]
+        futures += [executor.submit(get_json, path, params) for path, params in json_requests]
+        for future in futures:
+            try:
+                future.result()
+            except (requests.RequestException, ValueError):
+                # The page's own call for this endpoint retries and reports the failure
+                pass
+
+
+def get_rows(path, params=None):
+    """Fetch a small unpaginated list endpoint such as the /stats rollups."""
+    rows = get_json(path, params)
+    if not isinstance(rows, list):
+        raise ValueError(f"{path} returned {rows} instead of a list of rows")
+    return rows
@@ -1,10 +1,13 @@
 import os
 import time
+import tempfile
 from datetime import datetime
 from dotenv import load_dotenv
 from prefect import task, flow
+from prefect.futures import wait
+from prefect.task_runners import ThreadPoolTaskRunner
 from src.logger import logger_setup
-from src.utilities import fetch_all_nps_data, convert_json_to_parquet, save_to_minio
+from src.utilities import iter_nps_pages, stream_json_to_parquet, save_to_minio
 
 logger = logger_setup("data_ingestion.log")
 load_dotenv()
@@ -12,38 +15,59 @@ load_dotenv()
 MINIO_BUCKET_NAME = os.getenv('MINIO_BUCKET_NAME')
 
 NPS_API_KEY = os.getenv('NPS_API_KEY')
-PARKS_URL = os.getenv('NPS_PARKS_ENDPOINT')
-ALERTS_URL = os.getenv('NPS_ALERTS_ENDPOINT')
+NPS_ENDPOINTS = os.getenv('NPS_ENDPOINTS', 'parks,alerts')
+INGESTION_WORKERS = int(os.getenv('INGESTION_WORKERS', 4))
 
-@task
-def fetch_nps_data_task(api_key, url):
-    return fetch_all_nps_data(api_key, url)
+def get_nps_endpoints(endpoint_names=NPS_ENDPOINTS):
+    endpoints = {}
+    for name in endpoint_names.split(','):
+        name = name.strip().lower()
+        if not name:
+            continue
+        url = os.getenv(f"NPS_{name.upper()}_ENDPOINT")
+        if not url:
+            logger.warning(f"No URL configured for NPS endpoint '{name}' (set NPS_{name.upper()}_ENDPOINT), skipping")
+            continue
+        endpoints[name] = url
+    return endpoints
 
 @task
-def convert_to_parquet_task(data):
-    return convert_json_to_parquet(data)
+def fetch_to_parquet_task(api_key, url):
+    return stream_json_to_parquet(iter_nps_pages(api_key, url), sink=tempfile.TemporaryFile())
 
 @task
 def save_parquet_to_minio_task(parquet_data, bucket, filename):
-    return save_to_minio(parquet_data, bucket, filename)
+    try:
+        return save_to_minio(parquet_data, bucket, filename)
+    finally:
+        if hasattr(parquet_data, "close"):
+            parquet_data.close()
 
-@flow
+@flow(task_runner=ThreadPoolTaskRunner(max_workers=INGESTION_WORKERS))
 def data_ingestion():
     start_time = time.time()
     logger.info("Starting data ingestion process at %s.", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
     try:
-        parks_data = fetch_nps_data_task(NPS_API_KEY, PARKS_URL)
-        parks_data_parquet = convert_to_parquet_task(parks_data)
-        save_parquet_to_minio_task(parks_data_parquet, MINIO_BUCKET_NAME, "parks_data.parquet")
-
-        alerts_data = fetch_nps_data_task(NPS_API_KEY, ALERTS_URL)
-        alerts_data_parquet = convert_to_parquet_task(alerts_data)
-        save_parquet_to_minio_task(alerts_data_parquet, MINIO_BUCKET_NAME, "alerts_data.parquet")
+        endpoints = get_nps_endpoints()
+        logger.info(f"Ingesting NPS endpoints: {', '.join(endpoints)}")
+        futures = {}
+        for name, url in endpoints.items():
+            data_parquet = fetch_to_parquet_task.submit(NPS_API_KEY, url)
+            futures[name] = save_parquet_to_minio_task.submit(data_parquet, MINIO_BUCKET_NAME, f"{name}_data.parquet")
+        wait(list(futures.values()))
+        failed = []
+        for name, future in futures.items():
+            try:
+                future.result()
+            except Exception as e:
+                logger.error(f"Ingestion of NPS endpoint '{name}' failed: {e}")
+                failed.append(name)
+        if failed:
+            raise RuntimeError(f"Ingestion failed for {len(failed)} of {len(futures)} NPS endpoints: {', '.join(failed)}")
 
         end_time = time.time()
         duration = end_time - start_time
         logger.info(f"Ingestion process completed in {duration:.2f} seconds.")
     except Exception as e:
         logger.error(f"Data ingestion failed: {e}")
-
-
+        raise
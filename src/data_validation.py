@@ -1,11 +1,11 @@
-import os
-import glob
+import duckdb
 import polars as pl
 import sys
 import logging
 from pathlib import Path
 from typing import List, Any
 from datetime import datetime
+from src.utilities import duckdb_setup, ducklake_init
 
 
 class Validator:
@@ -122,58 +122,40 @@ def validate_public_use(df: pl.DataFrame) -> pl.DataFrame:
 
 
 DATA_DIR = Path("data")
+CATALOG_PATH = "catalog.ducklake"
 
+# Validated tables and their validators. Tables are read through DuckLake rather than from the
+# newest Parquet file, because incrementally merged tables (RAW.ALERTS) spread rows over many files
+TABLE_VALIDATIONS = {
+    "PARKS": validate_parks,
+    "ALERTS": validate_alerts,
+    "PUBLIC_USE": validate_public_use,
+}
 
-def get_latest_parquet_file(folder_path: str):
-    files = glob.glob(f"{folder_path}/*.parquet")
-    if not files:
-        print(f"No Parquet files found in {folder_path}")
-        return None
-    files.sort(key=lambda x: os.path.getmtime(x))
-    return files[-1]
-
-
-def get_latest_parquet_file_for(table_name: str, layer: str = "RAW") -> str | None:
-    folder = os.path.join("data", layer, table_name.upper())
-    return get_latest_parquet_file(folder)
 
+def load_table(conn, table_name: str, layer: str = "RAW") -> pl.DataFrame | None:
+    try:
+        return conn.execute(f"SELECT * FROM {layer}.{table_name.upper()}").pl()
+    except duckdb.CatalogException:
+        print(f"No {layer}.{table_name.upper()} table found")
+        return None
 
-def run_all_validations(layer: str = "RAW") -> pl.DataFrame:
-
-    parks_path = get_latest_parquet_file_for("PARKS", layer)
-    if parks_path:
-        parks_df = pl.read_parquet(parks_path)
-        parks_results = validate_parks(parks_df)
-    else:
-        parks_results = pl.DataFrame([])
-
-    alerts_path = get_latest_parquet_file_for("ALERTS", layer)
-    if alerts_path:
-        alerts_df = pl.read_parquet(alerts_path)
-        alerts_results = validate_alerts(alerts_df)
-    else:
-        alerts_results = pl.DataFrame([])
 
-    public_use_path = get_latest_parquet_file_for("PUBLIC_USE", layer)
-    if public_use_path:
-        public_use_df = pl.read_parquet(public_use_path)
-        public_use_results = validate_public_use(public_use_df)
-    else:
-        public_use_results = pl.DataFrame([])
+def run_all_validations(conn, layer: str = "RAW") -> pl.DataFrame:
 
-    results = pl.concat([
-        parks_results,
-        alerts_results,
-        public_use_results,
-    ])
+    results = []
+    for table_name, validate in TABLE_VALIDATIONS.items():
+        df = load_table(conn, table_name, layer)
+        if df is not None:
+            results.append(validate(df))
 
-    return results
+    return pl.concat(results) if results else pl.DataFrame([])
 
 
-def run_validations_nonblocking(layer: str = "RAW", fail_threshold: int = 0, raise_on_failure: bool = False):
+def run_validations_nonblocking(conn, layer: str = "RAW", fail_threshold: int = 0, raise_on_failure: bool = False):
 
     logger = logging.getLogger("data_validation")
-    results = run_all_validations(layer=layer)
+    results = run_all_validations(conn, layer=layer)
 
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     out_dir = DATA_DIR / "validation_reports"
@@ -201,10 +183,15 @@ def run_validations_nonblocking(layer: str = "RAW", fail_threshold: int = 0, rai
     return summary
 
 
-def data_quality_checks(layer: str | None = None, fail_threshold: int = 0, raise_on_failure: bool = False):
+def data_quality_checks(layer: str | None = None, fail_threshold: int = 0, raise_on_failure: bool = False, conn=None):
 
     if layer is None:
         layer = sys.argv[1] if len(sys.argv) > 1 else "RAW"
-    summary = run_validations_nonblocking(layer=layer, fail_threshold=fail_threshold, raise_on_failure=raise_on_failure)
+    if conn is None:
+        with duckdb_setup(read_only=True) as conn:
+            ducklake_init(conn, str(DATA_DIR), CATALOG_PATH)
+            summary = run_validations_nonblocking(conn, layer=layer, fail_threshold=fail_threshold, raise_on_failure=raise_on_failure)
+    else:
+        summary = run_validations_nonblocking(conn, layer=layer, fail_threshold=fail_threshold, raise_on_failure=raise_on_failure)
     print(summary)
     return summary
@@ -0,0 +1,44 @@
+import queue
+from contextlib import contextmanager
+from src.logger import logger_setup
+
+logger = logger_setup("db_pool.log")
+
+
+class CursorPool:
+    """
+    Fixed-size pool of DuckDB cursors over one shared connection.
+    Each cursor has its own client context but sees the same attached DuckLake catalog,
+    so concurrent requests run side by side instead of queuing on a single connection.
+    """
+
+    def __init__(self, conn, size, catalog="my_ducklake", timeout=None):
+        self.conn = conn
+        self.size = size
+        self.timeout = timeout
+        self._cursors = queue.LifoQueue(maxsize=size)
+        for _ in range(size):
+            cursor = conn.cursor()
+            cursor.execute(f"USE {catalog}")
+            self._cursors.put(cursor)
+        logger.info(f"Created DuckDB cursor pool with {size} cursors on catalog {catalog}")
+
+    @contextmanager
+    def cursor(self):
+        try:
+            cursor = self._cursors.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No DuckDB cursor available after {self.timeout} seconds")
+        try:
+            yield cursor
+        finally:
+            self._cursors.put(cursor)
+
+    def close(self):
+        while True:
+            try:
+                self._cursors.get_nowait().close()
+            except queue.Empty:
+                break
+        self.conn.close()
+        logger.info("Closed DuckDB cursor pool")
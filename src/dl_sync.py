@@ -5,7 +5,7 @@ from prefect import task, flow
 from dotenv import load_dotenv
 from src.logger import logger_setup
 from src.data_validation import data_quality_checks
-from src.utilities import duckdb_setup, ducklake_init, ducklake_connect_minio, sync_tables, cleanup_db_folders
+from src.utilities import duckdb_setup, ducklake_init, ducklake_connect_minio, sync_tables, cleanup_db_folders, get_incremental_tables, INCREMENTAL_SOURCES, INGEST_STATE_TABLE, MODEL_STATE_TABLE
 
 current_path = os.path.dirname(os.path.abspath(__file__))
 parent_path = os.path.abspath(os.path.join(current_path, ".."))
@@ -29,20 +29,24 @@ def ducklake_sync():
         ducklake_init(conn, data_path, catalog_path)
         ducklake_connect_minio(conn)
 
-        sync_tables(conn, logger, source_folder, schema="RAW", mode="ingest")
-        cleanup_db_folders(raw_ducklake_folder)
-        data_quality_checks()
+        refreshed_tables = sync_tables(conn, logger, source_folder, schema="RAW", mode="ingest")
+        cleanup_db_folders(raw_ducklake_folder, exclude=[*INCREMENTAL_SOURCES, INGEST_STATE_TABLE])
+        if refreshed_tables:
+            data_quality_checks(layer="RAW", conn=conn)
+        else:
+            logger.info("No source snapshots changed, rebuilding only SQL models whose SQL changed")
 
+        # Models are also rebuilt when their SQL changed, so transforms run even without new sources
         transform_folder = os.path.join(parent_path, "sql")
         staged_sql_folder = os.path.join(transform_folder, "staged")
         staged_ducklake_folder = os.path.join(data_path, "STAGED")
-        sync_tables(conn, logger, staged_sql_folder, schema="STAGED", mode="transform")
-        cleanup_db_folders(staged_ducklake_folder)
+        staged_tables = sync_tables(conn, logger, staged_sql_folder, schema="STAGED", mode="transform", changed_tables=refreshed_tables)
+        cleanup_db_folders(staged_ducklake_folder, exclude=[*get_incremental_tables(staged_sql_folder), MODEL_STATE_TABLE])
 
         curated_sql_folder = os.path.join(transform_folder, "curated")
         curated_ducklake_folder = os.path.join(data_path, "CURATED")
-        sync_tables(conn, logger, curated_sql_folder, schema="CURATED", mode="transform")
-        cleanup_db_folders(curated_ducklake_folder)
+        sync_tables(conn, logger, curated_sql_folder, schema="CURATED", mode="transform", changed_tables=staged_tables)
+        cleanup_db_folders(curated_ducklake_folder, exclude=[*get_incremental_tables(curated_sql_folder), MODEL_STATE_TABLE])
 
     end_time = time.time()
     duration = end_time - start_time
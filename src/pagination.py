@@ -0,0 +1,65 @@
+import json
+import base64
+
+
+def encode_cursor(values):
+    payload = json.dumps(values, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor, size):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid pagination cursor: {e}")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid pagination cursor: key does not match this endpoint")
+    return values
+
+
+def keyset_predicate(sort_keys, values):
+    """
+    Builds a NULL-safe predicate selecting rows strictly after `values` in
+    ORDER BY sort_keys (each ASC or DESC, always NULLS LAST).
+    """
+    branches = []
+    params = []
+    for i, (column, descending) in enumerate(sort_keys):
+        value = values[i]
+        if value is None:
+            # NULLS LAST: nothing sorts after NULL on this column
+            continue
+        operator = "<" if descending else ">"
+        terms = [f"{prior} IS NOT DISTINCT FROM ?" for prior, _ in sort_keys[:i]]
+        terms.append(f"({column} {operator} ? OR {column} IS NULL)")
+        branches.append("(" + " AND ".join(terms) + ")")
+        params.extend(values[:i])
+        params.append(value)
+    if not branches:
+        return "FALSE", []
+    return "(" + " OR ".join(branches) + ")", params
+
+
+def order_by_clause(sort_keys):
+    return ", ".join(f"{column} {'DESC' if descending else 'ASC'} NULLS LAST" for column, descending in sort_keys)
+
+
+def paginate_query(query, params, sort_keys, limit, cursor=None):
+    page_query = f"SELECT * FROM ({query}) page"
+    page_params = list(params)
+    if cursor:
+        predicate, predicate_params = keyset_predicate(sort_keys, decode_cursor(cursor, len(sort_keys)))
+        page_query += f" WHERE {predicate}"
+        page_params.extend(predicate_params)
+    page_query += f" ORDER BY {order_by_clause(sort_keys)} LIMIT ?"
+    page_params.append(limit + 1)
+    return page_query, page_params
+
+
+def split_page(table, sort_keys, limit):
+    if table.num_rows <= limit:
+        return table, None
+    page = table.slice(0, limit)
+    last_row = page.slice(limit - 1, 1).select([column for column, _ in sort_keys]).to_pylist()[0]
+    return page, encode_cursor([last_row[column] for column, _ in sort_keys])
@@ -0,0 +1,69 @@
+import time
+import threading
+from collections import OrderedDict
+from src.logger import logger_setup
+
+logger = logger_setup("response_cache.log")
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU cache of rendered responses, bounded by entry count and total bytes.
+    Callers put the DuckLake snapshot id in the key, so a new snapshot naturally misses
+    and stale entries age out through LRU eviction.
+    """
+
+    def __init__(self, max_entries=512, max_bytes=256 * 1024 * 1024, snapshot_ttl=5.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.snapshot_ttl = snapshot_ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._snapshot_checked_at = 0.0
+
+    def snapshot_id(self, lookup):
+        now = time.monotonic()
+        with self._lock:
+            if self._snapshot is not None and now - self._snapshot_checked_at < self.snapshot_ttl:
+                return self._snapshot
+        snapshot = lookup()
+        with self._lock:
+            self._snapshot = snapshot
+            self._snapshot_checked_at = now
+        return snapshot
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, body, status_code, headers):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous[0])
+            self._entries[key] = (body, status_code, headers)
+            self._size += len(body)
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted[0])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self._snapshot = None
+
+    def __len__(self):
+        return len(self._entries)
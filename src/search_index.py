@@ -0,0 +1,47 @@
+SEARCH_TERMS_TABLE = "CURATED.SEARCH_TERMS"
+SEARCH_TRIGRAMS_TABLE = "CURATED.SEARCH_TRIGRAMS"
+LIKE_WILDCARDS = ("%", "_")
+
+
+def term_trigrams(term):
+    if any(wildcard in term for wildcard in LIKE_WILDCARDS):
+        return []
+    return sorted({term[i:i + 3] for i in range(len(term) - 2)})
+
+
+def contains_filter(table_name, column, term, indexed=True):
+    """
+    Returns (sql, params) for a case-insensitive "column contains term" condition.
+    With the search index available the match is resolved against the column's distinct
+    terms (narrowed by trigrams for 3+ character terms) and applied as an IN semi-join,
+    instead of lowercasing and LIKE-scanning every row of the table.
+    """
+    term = term.lower()
+    pattern = f"%{term}%"
+    if not indexed:
+        return f"LOWER({column}) LIKE ?", [pattern]
+    sql = f"""{column} IN (
+        SELECT st.term FROM {SEARCH_TERMS_TABLE} st
+        WHERE st.table_name = ? AND st.column_name = ? AND st.term_lower LIKE ?"""
+    params = [table_name, column, pattern]
+    trigrams = term_trigrams(term)
+    if trigrams:
+        placeholders = ", ".join("?" for _ in trigrams)
+        sql += f"""
+          AND st.term_lower IN (
+            SELECT tg.term_lower FROM {SEARCH_TRIGRAMS_TABLE} tg
+            WHERE tg.table_name = ? AND tg.column_name = ? AND tg.trigram IN ({placeholders})
+            GROUP BY tg.term_lower
+            HAVING COUNT(*) = ?
+          )"""
+        params.extend([table_name, column, *trigrams, len(trigrams)])
+    sql += ")"
+    return sql, params
+
+
+def search_index_available(cursor):
+    rows = cursor.execute(
+        "SELECT table_name FROM information_schema.tables "
+        "WHERE table_catalog = current_database() AND table_schema = 'CURATED' AND table_name IN ('SEARCH_TERMS', 'SEARCH_TRIGRAMS')"
+    ).fetchall()
+    return len(rows) == 2
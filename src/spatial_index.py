@@ -0,0 +1,94 @@
+import math
+import numpy as np
+
+EARTH_RADIUS_MILES = 3959
+MAX_SEARCH_RADIUS_MILES = math.pi * EARTH_RADIUS_MILES
+
+
+def haversine_miles(lat, lon, lats, lons):
+    lat1, lon1 = math.radians(lat), math.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+class SpatialIndex:
+    """
+    Sorted-grid index over point records with latitude/longitude keys.
+    Points are bucketed into cell_size-degree cells and stored contiguously by cell,
+    so a radius query only measures points in the cells its bounding box touches.
+    """
+
+    def __init__(self, records, cell_size=1.0):
+        records = [
+            r for r in records
+            if r.get("latitude") is not None and r.get("longitude") is not None
+            and np.isfinite(r["latitude"]) and np.isfinite(r["longitude"])
+        ]
+        self.cell_size = cell_size
+        lats = np.array([r["latitude"] for r in records], dtype=float)
+        lons = np.array([r["longitude"] for r in records], dtype=float)
+        cell_lats = np.floor(lats / cell_size).astype(int)
+        cell_lons = np.floor(lons / cell_size).astype(int)
+        order = np.lexsort((cell_lons, cell_lats))
+        self.records = [records[i] for i in order]
+        self.lats = lats[order]
+        self.lons = lons[order]
+        self.cells = {}
+        sorted_cells = list(zip(cell_lats[order].tolist(), cell_lons[order].tolist()))
+        start = 0
+        for i in range(1, len(sorted_cells) + 1):
+            if i == len(sorted_cells) or sorted_cells[i] != sorted_cells[start]:
+                self.cells[sorted_cells[start]] = (start, i)
+                start = i
+
+    def __len__(self):
+        return len(self.records)
+
+    def _candidates(self, lat, lon, radius_miles):
+        angular_radius = radius_miles / EARTH_RADIUS_MILES
+        lat_delta = math.degrees(angular_radius)
+        if math.sin(angular_radius) >= math.cos(math.radians(lat)):
+            lon_delta = 180
+        else:
+            lon_delta = math.degrees(math.asin(math.sin(angular_radius) / math.cos(math.radians(lat))))
+        lat_cells = range(math.floor((lat - lat_delta) / self.cell_size), math.floor((lat + lat_delta) / self.cell_size) + 1)
+        if lon_delta >= 180:
+            lon_cells = None
+        else:
+            lon_cells = {
+                math.floor((((lon + offset + 180) % 360) - 180) / self.cell_size)
+                for offset in np.arange(-lon_delta, lon_delta + self.cell_size, self.cell_size).tolist() + [lon_delta]
+            }
+        if lon_cells is None or len(lat_cells) * len(lon_cells) > len(self.cells):
+            lat_range = (lat_cells.start, lat_cells.stop)
+            slices = [
+                span for (cell_lat, cell_lon), span in self.cells.items()
+                if lat_range[0] <= cell_lat < lat_range[1] and (lon_cells is None or cell_lon in lon_cells)
+            ]
+        else:
+            slices = [self.cells[(cl, co)] for cl in lat_cells for co in lon_cells if (cl, co) in self.cells]
+        if not slices:
+            return np.array([], dtype=int)
+        return np.concatenate([np.arange(start, end) for start, end in slices])
+
+    def within(self, lat, lon, radius_miles, limit=None):
+        candidates = self._candidates(lat, lon, min(radius_miles, MAX_SEARCH_RADIUS_MILES))
+        if candidates.size == 0:
+            return []
+        distances = haversine_miles(lat, lon, self.lats[candidates], self.lons[candidates])
+        mask = distances <= radius_miles
+        candidates, distances = candidates[mask], distances[mask]
+        order = np.argsort(distances, kind="stable")
+        if limit is not None:
+            order = order[:limit]
+        return [(self.records[candidates[i]], float(distances[i])) for i in order]
+
+    def nearest(self, lat, lon, k, max_radius_miles=None):
+        max_radius = min(max_radius_miles or MAX_SEARCH_RADIUS_MILES, MAX_SEARCH_RADIUS_MILES)
+        radius = min(25.0, max_radius)
+        while True:
+            matches = self.within(lat, lon, radius, limit=k)
+            if len(matches) >= k or radius >= max_radius:
+                return matches
+            radius = min(radius * 4, max_radius)
@@ -1,33 +1,22 @@
-import requests
 import pandas as pd
 import numpy as np
 import altair as alt
 import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
-
-API_URL = "http://localhost:8000"
+from dashboard_data import get_all_pages, get_json, get_rows, prefetch
 
 st.set_page_config(page_title="NomadIQ Website Mockup", layout="wide")
 
-def get_park_usage_summarized(park_name=None, aggregate=False, year=None):
-    """Fetch summarized usage data for all parks or a specific park, optionally filtered by year."""
-    params = {"granularity": "annual"}
-    if aggregate:
-        params["aggregate"] = True
-    if park_name:
-        params["park_name"] = park_name
-    if year:
-        params["year"] = year
-    resp = requests.get(f"{API_URL}/parks/usage", params=params)
-    if resp.status_code == 200:
-        return resp.json()
-    return []
+prefetch(
+    list_requests=[("/parks", None), ("/landmarks", None)],
+    json_requests=[("/landmarks/summary", None), ("/stats/yoy", None), ("/stats/parks-by-state", None)]
+)
 
 def fetch_all_parks():
-    resp = requests.get(f"{API_URL}/parks")
-    if resp.status_code == 200:
-        df = pd.DataFrame(resp.json())
+    parks = get_all_pages("/parks")
+    if parks:
+        df = pd.DataFrame(parks)
         return ["All Parks"] + sorted(df["name"].tolist())
     return ["All Parks"]
 
@@ -48,10 +37,7 @@ if selected_park == "All Parks":
 st.title(f"NomadIQ Navigator Dashboard - {selected_park}")
 
 def get_all_parks():
-    resp = requests.get(f"{API_URL}/parks")
-    if resp.status_code == 200:
-        return pd.DataFrame(resp.json())
-    return pd.DataFrame()
+    return pd.DataFrame(get_all_pages("/parks"))
 
 parks_df = get_all_parks()
 if not parks_df.empty:
@@ -134,61 +120,52 @@ if not parks_df.empty:
             starting_park = park_info.get("name", None)
             if starting_park:
                 try:
-                    response = requests.get(f"http://localhost:8000/parks/distances?starting_national_park={starting_park.lower()}")
-                    if response.status_code == 200:
-                        distances_data = response.json()
-                        if distances_data:
-                            dist_df = pd.DataFrame(distances_data)
-                            dist_df = dist_df.sort_values("distance_miles", ascending=True)
-                            st.subheader(f"Distances from {starting_park} to Other Parks")
-                            chart = alt.Chart(dist_df).mark_bar().encode(
-                                x=alt.X('distance_miles:Q', title='Distance (miles)'),
-                                y=alt.Y('destination_national_park:N', sort=list(dist_df['destination_national_park']), title='Destination Park'),
-                                tooltip=['destination_national_park', 'distance_miles']
-                            ).properties(height=300)
-                            st.altair_chart(chart, use_container_width=True)
-                        else:
-                            st.info("No distance data available for this park.")
+                    distances_data = get_all_pages("/parks/distances", {"starting_national_park": starting_park.lower()})
+                    if distances_data:
+                        dist_df = pd.DataFrame(distances_data)
+                        dist_df = dist_df.sort_values("distance_miles", ascending=True)
+                        st.subheader(f"Distances from {starting_park} to Other Parks")
+                        chart = alt.Chart(dist_df).mark_bar().encode(
+                            x=alt.X('distance_miles:Q', title='Distance (miles)'),
+                            y=alt.Y('destination_national_park:N', sort=list(dist_df['destination_national_park']), title='Destination Park'),
+                            tooltip=['destination_national_park', 'distance_miles']
+                        ).properties(height=300)
+                        st.altair_chart(chart, use_container_width=True)
                     else:
-                        st.warning("Could not fetch distance data.")
+                        st.info("No distance data available for this park.")
                 except Exception as e:
                     st.error(f"Error fetching distance data: {e}")
 
 
 def get_park_profile(name=None):
 	if name is None or name == "All Parks":
-		resp = requests.get(f"{API_URL}/parks")
-	else:
-		resp = requests.get(f"{API_URL}/parks", params={"name": name})
-	if resp.status_code == 200:
-		return resp.json()
-	return {}
+		return get_all_pages("/parks")
+	return get_all_pages("/parks", {"name": name})
 
 profile = get_park_profile(selected_park)
 
 
-def get_rec_visitor_data(name=None, year=None, month=None):
+def get_rec_visitor_data(name=None, year=None, month=None, park_codes=None, year_from=None, year_to=None):
     params = {"granularity": "monthly"}
     if name is not None and name != "All Parks":
         params["park_name"] = name
+    if park_codes:
+        params["park_code"] = list(park_codes)
     if year is not None:
         params["year"] = year
+    if year_from is not None:
+        params["year_from"] = year_from
+    if year_to is not None:
+        params["year_to"] = year_to
     if month is not None:
         params["month"] = month
-    resp = requests.get(f"{API_URL}/parks/usage", params=params)
-    if resp.status_code == 200:
-        return resp.json()
-    return []
+    return get_all_pages("/parks/usage", params)
 
 
 def get_park_alerts(park_name=None):
 	if park_name is None or park_name == "All Parks":
-		resp = requests.get(f"{API_URL}/parks/alerts")
-	else:
-		resp = requests.get(f"{API_URL}/parks/alerts", params={"park_name": park_name})
-	if resp.status_code == 200:
-		return resp.json()
-	return []
+		return get_all_pages("/parks/alerts")
+	return get_all_pages("/parks/alerts", {"park_name": park_name})
 
 alerts = get_park_alerts(selected_park)
 if isinstance(alerts, list) and alerts:
@@ -235,21 +212,15 @@ else:
 
 # --- Monthly Recreation Chart ---
 def show_monthly_recreation_chart(selected_parks):
-    all_monthly_data = get_rec_visitor_data(None)
-    df_all_monthly = pd.DataFrame(all_monthly_data)
+    park_codes = None
+    if selected_parks and "park_code" in parks_df.columns:
+        park_codes = sorted(parks_df.loc[parks_df["name"].isin(selected_parks), "park_code"].dropna().unique())
+        if not park_codes:
+            st.warning("No valid monthly recreation data available.")
+            return
+    df_all_monthly = pd.DataFrame(get_rec_visitor_data(park_codes=park_codes))
     if not df_all_monthly.empty and all(col in df_all_monthly.columns for col in ["Year", "Month", "RecreationVisits", "park_name"]):
-        df_all_monthly = df_all_monthly[df_all_monthly["Year"].notnull() & df_all_monthly["Month"].notnull()]
-        df_all_monthly = df_all_monthly[(df_all_monthly["Year"] != 0) & (df_all_monthly["Month"] != 0)]
-        df_all_monthly = df_all_monthly[df_all_monthly["Year"].apply(lambda x: pd.notna(x) and np.isfinite(x))]
-        df_all_monthly = df_all_monthly[df_all_monthly["Month"].apply(lambda x: pd.notna(x) and np.isfinite(x))]
-        df_all_monthly["Month"] = df_all_monthly["Month"].astype(int)
-        df_all_monthly["Year"] = df_all_monthly["Year"].astype(int)
-        if not selected_parks or len(selected_parks) == 0:
-            parks_to_show = df_all_monthly["park_name"].unique().tolist()
-        else:
-            parks_to_show = selected_parks
-        df_all_monthly = df_all_monthly[df_all_monthly["park_name"].isin(parks_to_show)]
-        df_all_monthly = df_all_monthly[df_all_monthly["Month"].between(1,12)]
+        parks_to_show = selected_parks if selected_parks else df_all_monthly["park_name"].unique().tolist()
         df_all_monthly.sort_values(["park_name", "Month"], inplace=True)
         fig = px.line(
             df_all_monthly,
@@ -277,15 +248,15 @@ def show_monthly_recreation_chart(selected_parks):
 
 
 if selected_park == "All Parks":
-    parks_list = selected_parks if selected_parks else [p for p in all_parks if p != "All Parks"]
+    # No selection means every park, which needs no park_code filter
+    parks_list = selected_parks or []
 else:
     parks_list = [selected_park]
 show_monthly_recreation_chart(parks_list)
 # --- Annual Totals for All Parks ---
-agg_usage_data = get_park_usage_summarized(aggregate=True)
+agg_usage_data = get_rows("/stats/yoy")
 if agg_usage_data:
     df_agg = pd.DataFrame(agg_usage_data)
-    df_agg = df_agg[df_agg["Year"] != 0]
     usage_melt = df_agg.melt(
         id_vars=["Year"],
         value_vars=[
@@ -316,12 +287,8 @@ else:
 
 
 # --- National Parks Heatmap ---
-if 'parks_df' in locals() or 'parks_df' in globals():
-    parks_states = parks_df.copy()
-    parks_states = parks_states.assign(state=parks_states['states'].str.split(',')).explode('state')
-    parks_states['state'] = parks_states['state'].str.strip()
-    park_counts = parks_states['state'].value_counts().reset_index()
-    park_counts.columns = ['state', 'num_parks']
+park_counts = pd.DataFrame(get_rows("/stats/parks-by-state"))
+if not park_counts.empty:
     fig = px.choropleth(
         park_counts,
         locations='state',
@@ -336,18 +303,14 @@ if 'parks_df' in locals() or 'parks_df' in globals():
     st.plotly_chart(fig, use_container_width=True)
 
 
-def get_parks_to_landmarks(park_name=None, state_abbr=None, limit=100, offset=0):
+def get_parks_to_landmarks(park_name=None, state_abbr=None, limit=100):
     params = {}
     if park_name:
         params["park_name"] = park_name
     if state_abbr:
         params["landmark_state"] = state_abbr
     params["limit"] = limit
-    params["offset"] = offset
-    resp = requests.get(f"{API_URL}/parks/landmarks", params=params)
-    if resp.status_code == 200:
-        return resp.json()
-    return []
+    return get_json("/parks/landmarks", params) or []
 
 st.subheader("Parks to Nearby Landmarks")
 col_landmark1, col_landmark2 = st.columns(2)
@@ -357,8 +320,7 @@ state_filter = col_landmark2.text_input("Filter by State")
 landmarks_data = get_parks_to_landmarks(
     park_name=park_filter if park_filter else None,
     state_abbr=state_filter if state_filter else None,
-    limit=100,
-    offset=0
+    limit=100
 )
 if landmarks_data:
     df_landmarks = pd.DataFrame(landmarks_data)
@@ -371,13 +333,9 @@ def get_landmarks_summary(state=None, state_abbr=None):
         params["state"] = state
     if state_abbr:
         params["state_abbr"] = state_abbr
-    resp = requests.get(f"{API_URL}/landmarks/summary", params=params)
-    if resp.status_code == 200:
-        return resp.json()
-    return {}
+    return get_json("/landmarks/summary", params or None) or {}
 
-landmarks_response = requests.get(f"{API_URL}/landmarks")
-landmarks = pd.DataFrame(landmarks_response.json()) if landmarks_response.status_code == 200 else pd.DataFrame()
+landmarks = pd.DataFrame(get_all_pages("/landmarks"))
 
 # Treemap visualization
 if not landmarks.empty and 'state_abbr' in landmarks.columns and 'level_of_significance' in landmarks.columns:
@@ -429,10 +387,7 @@ else:
 
 
 def get_state_parks_near_national_park(national_park_name):
-    resp = requests.get(f"{API_URL}/parks/state-distances", params={"national_park_name": national_park_name})
-    if resp.status_code == 200:
-        return resp.json()
-    return []
+    return get_all_pages("/parks/state-distances", {"national_park_name": national_park_name})
 
 activity_icons = {
     "camping_available": "🏕️",
@@ -446,8 +401,13 @@ activity_icons = {
     "wildlife_available": "🦌"
 }
 
-def format_activities(row):
-    return " ".join([icon for key, icon in activity_icons.items() if row.get(key)])
+def format_activities(df):
+    """Build the activity icon string for every row at once, one column operation per activity."""
+    activities = pd.Series("", index=df.index)
+    for key, icon in activity_icons.items():
+        if key in df.columns:
+            activities += np.where(df[key].fillna(False).astype(bool), icon + " ", "")
+    return activities.str.rstrip()
 
 
 # --- State Parks Map Visualization ---
@@ -470,21 +430,21 @@ if selected_park != "All Parks":
             name=selected_park,
             text=[selected_park],
         ))
-        for _, row in df_state_parks.iterrows():
-            activities = format_activities(row) 
-            hover_text = (
-                f"{row['state_park_name']} ({row['distance_miles']} mi)<br>"
-                f"{row['state_park_address']}, {row['state_park_city']}, {row['state_park_zip']}<br>"
-                f"Activities: {activities}"
-            )
-            fig.add_trace(go.Scattermap(
-                lat=[row['state_park_latitude']],
-                lon=[row['state_park_longitude']],
-                mode='markers',
-                marker=dict(size=12, color='green'),
-                name=row['state_park_name'],
-                text=[hover_text]
-            ))
+        hover_text = (
+            df_state_parks['state_park_name'].astype(str) + " (" + df_state_parks['distance_miles'].astype(str) + " mi)<br>"
+            + df_state_parks['state_park_address'].astype(str) + ", " + df_state_parks['state_park_city'].astype(str) + ", "
+            + df_state_parks['state_park_zip'].astype(str) + "<br>"
+            + "Activities: " + format_activities(df_state_parks)
+        )
+        fig.add_trace(go.Scattermap(
+            lat=df_state_parks['state_park_latitude'],
+            lon=df_state_parks['state_park_longitude'],
+            mode='markers',
+            marker=dict(size=12, color='green'),
+            name="State Parks",
+            text=hover_text,
+            hoverinfo='text'
+        ))
         fig.update_layout(
             mapbox=dict(
                 style="open-street-map",
@@ -1,13 +1,9 @@
-import requests
 import pandas as pd
-import numpy as np
 import altair as alt
 import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
-
-API_URL = "http://localhost:8000"
-
+from dashboard_data import get_all_pages, get_rows, prefetch
 
 st.markdown("""
 	<style>
@@ -24,6 +20,19 @@ st.markdown("""
 
 st.set_page_config(page_title="NomadIQ Navigator Dashboard", layout="wide")
 
+prefetch(
+	list_requests=[
+		("/parks", None),
+		("/landmarks", None),
+		("/parks/alerts", None),
+	],
+	json_requests=[
+		("/stats/yoy", {"year_from": 2023, "year_to": 2024}),
+		("/stats/top-parks", {"year": 2024, "n": 5}),
+		("/stats/yoy", None),
+	]
+)
+
 
 st.markdown("# NomadIQ Navigator Dashboard")
 
@@ -31,26 +40,21 @@ st.markdown("# NomadIQ Navigator Dashboard")
 hero = st.container()
 with hero:
 	# --- Usage Data and Metrics Logic ---
-	usage_response = requests.get(f"{API_URL}/parks/usage?granularity=annual&aggregate=false")
-	usage = pd.DataFrame(usage_response.json()) if usage_response.status_code == 200 else pd.DataFrame()
 	last_year = 2024
 	prev_year = 2023
-	visitors_last_year = usage[usage['Year'] == last_year]['total_recreation_visits'].sum() if not usage.empty and 'Year' in usage.columns else 0
-	visitors_prev = usage[usage['Year'] == prev_year]['total_recreation_visits'].sum() if not usage.empty and 'Year' in usage.columns else 0
-	pct_change_yoy = ((visitors_last_year - visitors_prev) / visitors_prev * 100) if visitors_prev else 0
-	top5_parks = []
-	if not usage.empty and 'Year' in usage.columns and 'park_name' in usage.columns:
-		top_rows = usage[(usage['Year'] == last_year) & usage['park_name'].notnull()].sort_values('total_recreation_visits', ascending=False).head(5)
-		for _, row in top_rows.iterrows():
-			top5_parks.append((row['park_name'], int(row['total_recreation_visits'])))
+	yoy_by_year = {row.get('Year'): row for row in get_rows("/stats/yoy", {"year_from": prev_year, "year_to": last_year})}
+	annual_totals = yoy_by_year.get(last_year, {})
+	pct_change_yoy = annual_totals.get('pct_change_yoy') or 0
+	top5_parks = [
+		(row['park_name'], int(row['total_recreation_visits']))
+		for row in get_rows("/stats/top-parks", {"year": last_year, "n": 5})
+	]
 
 	col_map, col_right = st.columns([1, 1], gap="large")
 
 	with col_map:
-		parks_response = requests.get(f"{API_URL}/parks")
-		parks = pd.DataFrame(parks_response.json()) if parks_response.status_code == 200 else pd.DataFrame()
-		landmarks_response = requests.get(f"{API_URL}/landmarks")
-		landmarks = pd.DataFrame(landmarks_response.json()) if landmarks_response.status_code == 200 else pd.DataFrame()
+		parks = pd.DataFrame(get_all_pages("/parks"))
+		landmarks = pd.DataFrame(get_all_pages("/landmarks"))
 		map_type = st.selectbox("Show:", ["Parks", "Landmarks"], index=0, key="map_type_select")
 		if map_type == "Parks" and not parks.empty:
 			if "latitude" in parks.columns and "longitude" in parks.columns:
@@ -72,62 +76,27 @@ with hero:
 			else:
 				st.warning("Park latitude/longitude data not available.")
 		elif map_type == "Landmarks" and not landmarks.empty:
-			city_state_coords = {
-				("New York", "NY"): (40.7128, -74.0060),
-				("Los Angeles", "CA"): (34.0522, -118.2437),
-				("Chicago", "IL"): (41.8781, -87.6298),
-				("Houston", "TX"): (29.7604, -95.3698),
-				("Phoenix", "AZ"): (33.4484, -112.0740),
-			}
-			state_coords = {
-				"AL": (32.806671, -86.791130), "AK": (61.370716, -152.404419), "AZ": (33.729759, -111.431221),
-				"AR": (34.969704, -92.373123), "CA": (36.116203, -119.681564), "CO": (39.059811, -105.311104),
-				"CT": (41.597782, -72.755371), "DE": (39.318523, -75.507141), "FL": (27.766279, -81.686783),
-				"GA": (33.040619, -83.643074), "HI": (21.094318, -157.498337), "ID": (44.240459, -114.478828),
-				"IL": (40.349457, -88.986137), "IN": (39.849426, -86.258278), "IA": (42.011539, -93.210526),
-				"KS": (38.526600, -96.726486), "KY": (37.668140, -84.670067), "LA": (31.169546, -91.867805),
-				"ME": (44.693947, -69.381927), "MD": (39.063946, -76.802101), "MA": (42.230171, -71.530106),
-				"MI": (43.326618, -84.536095), "MN": (45.694454, -93.900192), "MS": (32.741646, -89.678696),
-				"MO": (38.456085, -92.288368), "MT": (46.921925, -110.454353), "NE": (41.125370, -98.268082),
-				"NV": (38.313515, -117.055374), "NH": (43.452492, -71.563896), "NJ": (40.298904, -74.521011),
-				"NM": (34.840515, -106.248482), "NY": (42.165726, -74.948051), "NC": (35.630066, -79.806419),
-				"ND": (47.528912, -99.784012), "OH": (40.388783, -82.764915), "OK": (35.565342, -96.928917),
-				"OR": (44.572021, -122.070938), "PA": (40.590752, -77.209755), "RI": (41.680893, -71.511780),
-				"SC": (33.856892, -80.945007), "SD": (44.299782, -99.438828), "TN": (35.747845, -86.692345),
-				"TX": (31.054487, -97.563461), "UT": (40.150032, -111.862434), "VT": (44.045876, -72.710686),
-				"VA": (37.769337, -78.169968), "WA": (47.400902, -121.490494), "WV": (38.491226, -80.954578),
-				"WY": (42.755966, -107.302490), "WI": (44.268543, -89.616508)
-			}
-			def get_coords(row):
-				city, state_abbr = row.get("city"), row.get("state_abbr")
-				coords = city_state_coords.get((city, state_abbr))
-				if coords:
-					return coords
-				lat, lon = state_coords.get(state_abbr, (None, None))
-				if lat is not None and lon is not None:
-					lat += np.random.uniform(-0.2, 0.2)
-					lon += np.random.uniform(-0.2, 0.2)
-				return (lat, lon)
-			landmarks["latitude"], landmarks["longitude"] = zip(*landmarks.apply(get_coords, axis=1))
-			fig = px.scatter_geo(
-				landmarks.dropna(subset=["latitude", "longitude"]),
-				lat="latitude",
-				lon="longitude",
-				hover_name="property_name" if "property_name" in landmarks.columns else "state",
-				color="category_of_property" if "category_of_property" in landmarks.columns else None,
-				scope="north america",
-				title="Landmarks Locations"
-			)
-			fig.update_geos(
-				center=dict(lat=39.8283, lon=-98.5795),
-				projection_scale=2.2
-			)
-			st.plotly_chart(fig, use_container_width=True)
+			if "latitude" in landmarks.columns and "longitude" in landmarks.columns:
+				fig = px.scatter_geo(
+					landmarks.dropna(subset=["latitude", "longitude"]),
+					lat="latitude",
+					lon="longitude",
+					hover_name="property_name" if "property_name" in landmarks.columns else "state",
+					color="category_of_property" if "category_of_property" in landmarks.columns else None,
+					scope="north america",
+					title="Landmarks Locations"
+				)
+				fig.update_geos(
+					center=dict(lat=39.8283, lon=-98.5795),
+					projection_scale=2.2
+				)
+				st.plotly_chart(fig, use_container_width=True)
+			else:
+				st.warning("Landmark latitude/longitude data not available.")
 
 	# --- Right Column: Metrics, Top 5 Parks, Annual Totals ---
 	with col_right:
-		alerts_response = requests.get(f"{API_URL}/parks/alerts")
-		alerts = pd.DataFrame(alerts_response.json()) if alerts_response.status_code == 200 else pd.DataFrame()
+		alerts = pd.DataFrame(get_all_pages("/parks/alerts"))
 		parks_with_closure_alerts = 0
 		pct_parks_with_alerts = 0
 		if not alerts.empty and 'park_name' in alerts.columns and 'alert_category' in alerts.columns:
@@ -178,12 +147,6 @@ with hero:
 			<h4 style='font-size:1.1rem; margin-bottom:0.5rem;'>2024 Annual Totals</h4>
 			<div style='display: flex; flex-direction: column; align-items: center; gap: 0.25rem; padding: 0; margin: 0;'>
 			""", unsafe_allow_html=True)
-			annual_totals_response = requests.get(f"{API_URL}/parks/usage?year=2024&granularity=annual&aggregate=true")
-			annual_totals_raw = annual_totals_response.json() if annual_totals_response.status_code == 200 else {}
-			if isinstance(annual_totals_raw, list) and len(annual_totals_raw) > 0:
-				annual_totals = annual_totals_raw[0]
-			else:
-				annual_totals = annual_totals_raw if isinstance(annual_totals_raw, dict) else {}
 			metrics = [
 				("Total Recreation Visits", annual_totals.get('total_recreation_visits', 0)),
 				("Total Non-Recreation Visits", annual_totals.get('total_non_recreation_visits', 0)),
@@ -205,8 +168,7 @@ with current:
 	col_alerts, col_heatmap = st.columns([1, 1])
 	with col_alerts:
 		st.subheader("Alert Summary & Table")
-		alerts_response = requests.get(f"{API_URL}/parks/alerts")
-		alerts = pd.DataFrame(alerts_response.json()) if alerts_response.status_code == 200 else pd.DataFrame()
+		alerts = pd.DataFrame(get_all_pages("/parks/alerts"))
 		date_col = 'lastIndexedDate' if 'lastIndexedDate' in alerts.columns else None
 		date_filter = st.selectbox("Show alerts for:", ["This Month", "This Year", "Since Origin"], index=0, key="alert_date_filter")
 
@@ -269,19 +231,23 @@ with current:
 trends = st.container()
 with trends:
 	st.markdown("## Park Visitor Trends")
-	usage_response = requests.get(f"{API_URL}/parks/usage?granularity=annual&aggregate=false")
-	usage = pd.DataFrame(usage_response.json()) if usage_response.status_code == 200 else pd.DataFrame()
-	park_options = usage['park_name'].dropna().unique().tolist() if not usage.empty and 'park_name' in usage.columns else []
+	park_list = pd.DataFrame(get_all_pages("/parks"))
+	park_options = sorted(park_list['name'].dropna().unique().tolist()) if not park_list.empty and 'name' in park_list.columns else []
 	selected_park = st.selectbox("Filter by Park:", ["All Parks"] + park_options, index=0)
 
 	x_col = 'Year'
 	title_suffix = 'Year'
 	if selected_park == "All Parks":
-		df_line = usage.groupby(x_col, as_index=False)['total_recreation_visits'].sum()
+		# Per-year totals across all parks come pre-aggregated from the PARK_USAGE_YEARLY rollup
+		usage = pd.DataFrame(get_rows("/stats/yoy"))
 		title_line = f"Total Visitors per {title_suffix} (All Parks)"
 	else:
-		df_line = usage[usage['park_name'] == selected_park].groupby(x_col, as_index=False)['total_recreation_visits'].sum()
+		usage = pd.DataFrame(get_all_pages("/parks/usage", {"granularity": "annual", "park_name": selected_park}))
+		if not usage.empty and 'park_name' in usage.columns:
+			usage = usage[usage['park_name'] == selected_park]
 		title_line = f"Total Visitors per {title_suffix} ({selected_park})"
+	has_usage = not usage.empty and x_col in usage.columns
+	df_line = usage.groupby(x_col, as_index=False)['total_recreation_visits'].sum() if has_usage else pd.DataFrame()
 	if not df_line.empty:
 		fig_line = px.line(df_line, x=x_col, y='total_recreation_visits', markers=True, title=title_line, labels={'total_recreation_visits': 'Total Visitors'})
 		fig_line.update_traces(line=dict(width=3), marker=dict(size=8))
@@ -300,10 +266,7 @@ with trends:
     "total_rv_campers": "Total RV Campers"
 }
 
-	if selected_park == "All Parks":
-		df_facet = usage.groupby(x_col, as_index=False)[visitor_types].sum()
-	else:
-		df_facet = usage[usage['park_name'] == selected_park].groupby(x_col, as_index=False)[visitor_types].sum()
+	df_facet = usage.groupby(x_col, as_index=False)[visitor_types].sum() if has_usage else pd.DataFrame()
 	if not df_facet.empty:
 		df_facet_melt = df_facet.melt(id_vars=x_col, value_vars=visitor_types, var_name='Visitor Type', value_name='Count')
 		df_facet_melt['Visitor Type'] = df_facet_melt['Visitor Type'].map(visitor_type_labels)
@@ -326,8 +289,7 @@ with trends:
 	with landmarks_row:
 		st.markdown("### Landmarks Overview")
 		col_lm_bar, col_lm_treemap = st.columns([1, 1])
-		landmarks_response = requests.get(f"{API_URL}/landmarks")
-		landmarks = pd.DataFrame(landmarks_response.json()) if landmarks_response.status_code == 200 else pd.DataFrame()
+		landmarks = pd.DataFrame(get_all_pages("/landmarks"))
         
 		with col_lm_bar:
 			if not landmarks.empty and 'level_of_significance' in landmarks.columns:
@@ -1,9 +1,17 @@
 import os
 import io
+import re
+import hashlib
+import tempfile
 import duckdb
 import requests
 import polars as pl
+import pyarrow as pa
+import pyarrow.parquet as pq
 from minio import Minio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from requests.adapters import HTTPAdapter
 from prefect import task
 from prefect.cache_policies import NO_CACHE
 from datetime import datetime
@@ -13,22 +21,100 @@ from src.logger import logger_setup
 load_dotenv()
 logger = logger_setup("utilities.log")
 
+NPS_PAGE_SIZE = 50
+NPS_FETCH_WORKERS = int(os.getenv('NPS_FETCH_WORKERS', 8))
+PARQUET_ROWS_PER_GROUP = int(os.getenv('PARQUET_ROWS_PER_GROUP', 1000))
+MINIO_PART_SIZE = int(os.getenv('MINIO_PART_SIZE', 16 * 1024 * 1024))
+MINIO_PARALLEL_UPLOADS = int(os.getenv('MINIO_PARALLEL_UPLOADS', 4))
+
+SQL_TRANSFORM_WORKERS = int(os.getenv('SQL_TRANSFORM_WORKERS', 4))
+SQL_COMMENT_PATTERN = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+SQL_TARGET_PATTERN = re.compile(r"CREATE\s+(?:OR\s+REPLACE\s+)?TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?([A-Za-z_]\w*\.[A-Za-z_]\w*)", re.IGNORECASE)
+SQL_CONFIG_PATTERN = re.compile(r"^\s*--\s*(materialized|unique_key|change_column)\s*:\s*(.+?)\s*$", re.IGNORECASE | re.MULTILINE)
+SQL_SELECT_PATTERN = re.compile(r"CREATE\s+(?:OR\s+REPLACE\s+)?TABLE\s+\S+\s+AS\s+(.*)", re.IGNORECASE | re.DOTALL)
+SQL_REFERENCE_PATTERN = re.compile(r"\b(?:FROM|JOIN)\s+([A-Za-z_]\w*\.[A-Za-z_]\w*)", re.IGNORECASE)
+
+CONTENT_HASH_METADATA_KEY = "content-sha256"
+UPLOAD_SKIPPED = "skipped"
+INGEST_STATE_TABLE = "INGEST_STATE"
+MODEL_STATE_TABLE = "MODEL_STATE"
+INCREMENTAL_SOURCES = {
+    "ALERTS": ("id", "lastIndexedDate"),
+}
+
+_nps_session = None
+_minio_client = None
+_minio_client_pid = None
+
 def get_minio_client():
-    return Minio(
-        os.getenv('MINIO_EXTERNAL_URL'),
-        access_key=os.getenv('MINIO_ACCESS_KEY'),
-        secret_key=os.getenv('MINIO_SECRET_KEY'),
-        secure=False
-    )
+    global _minio_client, _minio_client_pid
+    if _minio_client is None or _minio_client_pid != os.getpid():
+        _minio_client = Minio(
+            os.getenv('MINIO_EXTERNAL_URL'),
+            access_key=os.getenv('MINIO_ACCESS_KEY'),
+            secret_key=os.getenv('MINIO_SECRET_KEY'),
+            secure=False
+        )
+        _minio_client_pid = os.getpid()
+    return _minio_client
+
+def get_nps_session():
+    global _nps_session
+    if _nps_session is None:
+        _nps_session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=NPS_FETCH_WORKERS)
+        _nps_session.mount("https://", adapter)
+        _nps_session.mount("http://", adapter)
+    return _nps_session
+
+def fetch_nps_page(session, api_key, base_url, start, batch_size=NPS_PAGE_SIZE):
+    params = {
+        "api_key": api_key,
+        "limit": batch_size,
+        "start": start
+    }
+    response = session.get(base_url, params=params)
+    response.raise_for_status()
+    return response.json()
+
+def iter_nps_pages(api_key, base_url, max_workers=NPS_FETCH_WORKERS, batch_size=NPS_PAGE_SIZE):
+    session = get_nps_session()
+    first_page = fetch_nps_page(session, api_key, base_url, 0, batch_size)
+    data = first_page.get("data", [])
+    total = int(first_page.get("total", len(data)))
+    yield data
+    offsets = range(batch_size, total, batch_size)
+    if not offsets:
+        return
+    logger.info(f"Fetching {len(offsets)} remaining pages from {base_url} with {max_workers} workers")
+    remaining = iter(offsets)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        def submit_next():
+            start = next(remaining, None)
+            if start is not None:
+                in_flight.append(executor.submit(fetch_nps_page, session, api_key, base_url, start, batch_size))
+        # Sliding window: at most max_workers pages are fetched ahead of the consumer
+        in_flight = deque()
+        for _ in range(max_workers):
+            submit_next()
+        while in_flight:
+            page = in_flight.popleft().result()
+            submit_next()
+            yield page.get("data", [])
 
 @task
-def fetch_all_nps_data(api_key, base_url):
-    batch_size = 50
+def fetch_all_nps_data(api_key, base_url, concurrent=False, max_workers=NPS_FETCH_WORKERS):
+    batch_size = NPS_PAGE_SIZE
     all_data = []
     start = 0
     total = None
     try:
         logger.info("Starting NPS data fetch...")
+        if concurrent:
+            for page in iter_nps_pages(api_key, base_url, max_workers, batch_size):
+                all_data.extend(page)
+            logger.info(f"Fetched {len(all_data)} records from {base_url}")
+            return all_data
         while total is None or len(all_data) < total:
             params = {
                 "api_key": api_key,
@@ -72,23 +158,131 @@ def convert_json_to_parquet(data):
         logger.error(f"Error converting JSON to Parquet: {e}")
         return None
 
+def conform_to_schema(table, schema):
+    extra_columns = set(table.column_names) - set(schema.names)
+    if extra_columns:
+        raise ValueError(f"Columns not in the Parquet schema: {sorted(extra_columns)}")
+    columns = []
+    for field in schema:
+        if field.name in table.column_names:
+            try:
+                columns.append(table[field.name].cast(field.type))
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+                raise ValueError(f"Column {field.name} does not match Parquet schema type {field.type}: {e}")
+        else:
+            columns.append(pa.nulls(table.num_rows, type=field.type))
+    return pa.Table.from_arrays(columns, schema=schema)
+
+def normalize_records(records, schema=None):
+    table = pl.json_normalize(records).to_arrow()
+    if schema is None:
+        return table
+    return conform_to_schema(table, schema)
+
+def spill_table(table):
+    spill = tempfile.TemporaryFile()
+    with pa.ipc.new_stream(spill, table.schema) as writer:
+        writer.write_table(table)
+    spill.seek(0)
+    return spill
+
+def iter_record_batches(pages, rows_per_group):
+    pending = []
+    for page in pages:
+        pending.extend(page)
+        if len(pending) >= rows_per_group:
+            yield pending
+            pending = []
+    if pending:
+        yield pending
+
+@task(cache_policy=NO_CACHE)
+def stream_json_to_parquet(pages, sink=None, schema=None, rows_per_group=PARQUET_ROWS_PER_GROUP):
+    """
+    Writes NPS pages to Parquet, one row group per rows_per_group records.
+    With an explicit schema every batch is cast to it as it arrives. Otherwise each batch is
+    spilled to a temporary Arrow file while the batch schemas are unified (all-null fields widen
+    to the type seen later, nested fields that appear later are added), and the file is written
+    once the final schema is known. Conflicting types raise instead of being dropped.
+    """
+    sink = sink if sink is not None else io.BytesIO()
+    spills = []
+    total_rows = 0
+    try:
+        logger.info("Streaming JSON pages to Parquet format")
+        if schema is not None:
+            with pq.ParquetWriter(sink, schema) as writer:
+                for records in iter_record_batches(pages, rows_per_group):
+                    table = normalize_records(records, schema)
+                    writer.write_table(table)
+                    total_rows += table.num_rows
+        else:
+            for records in iter_record_batches(pages, rows_per_group):
+                table = normalize_records(records)
+                schema = table.schema if schema is None else pa.unify_schemas([schema, table.schema], promote_options="permissive")
+                spills.append(spill_table(table))
+            if schema is not None:
+                with pq.ParquetWriter(sink, schema) as writer:
+                    for spill in spills:
+                        table = conform_to_schema(pa.ipc.open_stream(spill).read_all(), schema)
+                        writer.write_table(table)
+                        total_rows += table.num_rows
+        if not total_rows:
+            raise ValueError("No data provided for conversion")
+        sink.seek(0)
+        logger.info(f"Wrote {total_rows} records to Parquet")
+        return sink
+    except Exception as e:
+        logger.error(f"Error streaming JSON to Parquet: {e}")
+        raise
+    finally:
+        for spill in spills:
+            spill.close()
+
+def compute_content_hash(buffer, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    buffer.seek(0)
+    for chunk in iter(lambda: buffer.read(chunk_size), b""):
+        digest.update(chunk)
+    buffer.seek(0)
+    return digest.hexdigest()
+
+def get_latest_content_hash(minio_client, bucket_name, prefix):
+    objects = [obj.object_name for obj in minio_client.list_objects(bucket_name, prefix=prefix)]
+    if not objects:
+        return None
+    latest_object = max(objects)
+    stat = minio_client.stat_object(bucket_name, latest_object)
+    return stat.metadata.get(f"x-amz-meta-{CONTENT_HASH_METADATA_KEY}")
+
 @task
-def save_to_minio(buffer, bucket_name, object_name):
+def save_to_minio(buffer, bucket_name, object_name, part_size=MINIO_PART_SIZE):
     minio_client = get_minio_client()
     try:
-        ext = object_name.split('.')[-1]
+        base_name, ext = object_name.split('.')[0], object_name.split('.')[-1]
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        timestamped_filename = f"{object_name.split('.')[0]}_{timestamp}.{ext}"
-        data_bytes = buffer.getvalue()
+        timestamped_filename = f"{base_name}_{timestamp}.{ext}"
+        content_hash = compute_content_hash(buffer)
+        if get_latest_content_hash(minio_client, bucket_name, f"{base_name}_") == content_hash:
+            logger.info(f"{object_name} is unchanged since the last upload (sha256 {content_hash}), skipping")
+            return UPLOAD_SKIPPED
+        buffer.seek(0, io.SEEK_END)
+        length = buffer.tell()
+        buffer.seek(0)
         minio_client.put_object(
             bucket_name,
             timestamped_filename,
-            io.BytesIO(data_bytes),
-            length=len(data_bytes)
+            buffer,
+            length=length,
+            metadata={CONTENT_HASH_METADATA_KEY: content_hash},
+            part_size=part_size,
+            num_parallel_uploads=MINIO_PARALLEL_UPLOADS
         )
         logger.info(f"Successfully uploaded {timestamped_filename} to MinIO bucket {bucket_name}")
+        return timestamped_filename
     except Exception as e:
-        logger.error(f"Failed to upload {timestamped_filename} to MinIO: {e}")
+        logger.error(f"Failed to upload {object_name} to MinIO: {e}")
+        raise
 
 def duckdb_setup(read_only=False):
     try:
@@ -161,7 +355,281 @@ def remove_old_files(file_paths, latest_files):
             print(f"Failed to remove {file_path}: {e}")
 
 
-def sync_tables(conn, logger, source_folder, schema="RAW", mode=None):
+def table_exists(conn, schema, table):
+    query = """
+    SELECT COUNT(*) FROM information_schema.tables
+    WHERE table_catalog = current_database() AND table_schema = ? AND table_name = ?
+    """
+    return conn.execute(query, [schema, table]).fetchone()[0] > 0
+
+def create_ingest_state(conn, schema):
+    conn.execute(f"""
+    CREATE TABLE IF NOT EXISTS {schema}.{INGEST_STATE_TABLE} (
+        source_name VARCHAR,
+        source_file VARCHAR,
+        high_water_mark TIMESTAMP,
+        updated_at TIMESTAMP
+    )
+    """)
+
+def get_ingest_state(conn, schema, source_name):
+    create_ingest_state(conn, schema)
+    row = conn.execute(
+        f"SELECT source_file, high_water_mark FROM {schema}.{INGEST_STATE_TABLE} WHERE source_name = ?",
+        [source_name]
+    ).fetchone()
+    return row if row else (None, None)
+
+def set_ingest_state(conn, schema, source_name, source_file, high_water_mark):
+    conn.execute(f"DELETE FROM {schema}.{INGEST_STATE_TABLE} WHERE source_name = ?", [source_name])
+    conn.execute(
+        f"INSERT INTO {schema}.{INGEST_STATE_TABLE} VALUES (?, ?, ?, CURRENT_TIMESTAMP)",
+        [source_name, source_file, high_water_mark]
+    )
+
+def load_full_source(conn, table_name, file_path, file_name):
+    query = f"""
+    CREATE OR REPLACE TABLE {table_name} AS
+    SELECT *,
+        '{file_name}' AS _source_file,
+        CURRENT_TIMESTAMP AS _ingestion_timestamp,
+        ROW_NUMBER() OVER () AS _record_id
+    FROM read_parquet('{file_path}');
+    """
+    conn.execute(query)
+
+def merge_incremental_source(conn, schema, source_name, file_path, file_name, key_column, change_column):
+    table_name = f"{schema}.{source_name}"
+    _, high_water_mark = get_ingest_state(conn, schema, source_name)
+    change_expr = f"TRY_CAST({change_column} AS TIMESTAMP)"
+    if high_water_mark is None or not table_exists(conn, schema, source_name):
+        load_full_source(conn, table_name, file_path, file_name)
+        logger.info(f"Loaded {table_name} in full to start incremental tracking")
+    else:
+        merge_query = f"""
+        MERGE INTO {table_name} AS t
+        USING (
+            SELECT *,
+                '{file_name}' AS _source_file,
+                CURRENT_TIMESTAMP AS _ingestion_timestamp,
+                (SELECT COALESCE(MAX(_record_id), 0) FROM {table_name}) + ROW_NUMBER() OVER () AS _record_id
+            FROM read_parquet('{file_path}')
+            WHERE {change_expr} > ?
+                OR {key_column} NOT IN (SELECT {key_column} FROM {table_name} WHERE {key_column} IS NOT NULL)
+        ) AS s
+        ON t.{key_column} = s.{key_column}
+        WHEN MATCHED THEN UPDATE
+        WHEN NOT MATCHED THEN INSERT BY NAME;
+        """
+        try:
+            changed = conn.execute(merge_query, [high_water_mark]).fetchone()[0]
+            removed = conn.execute(f"""
+            DELETE FROM {table_name}
+            WHERE {key_column} NOT IN (
+                SELECT {key_column} FROM read_parquet('{file_path}') WHERE {key_column} IS NOT NULL
+            );
+            """).fetchone()[0]
+            logger.info(f"Merged {changed} new or changed rows into {table_name}, removed {removed} rows no longer in the source")
+        except duckdb.Error as e:
+            logger.warning(f"Incremental merge into {table_name} failed ({e}), reloading in full")
+            load_full_source(conn, table_name, file_path, file_name)
+    new_high_water_mark = conn.execute(
+        f"SELECT MAX({change_expr}) FROM read_parquet('{file_path}')"
+    ).fetchone()[0]
+    if high_water_mark is not None and (new_high_water_mark is None or new_high_water_mark < high_water_mark):
+        new_high_water_mark = high_water_mark
+    set_ingest_state(conn, schema, source_name, file_name, new_high_water_mark)
+    logger.info(f"High-water mark for {table_name} is now {new_high_water_mark}")
+
+def parse_sql_model(sql_script):
+    body = SQL_COMMENT_PATTERN.sub(" ", sql_script)
+    match = SQL_TARGET_PATTERN.search(body)
+    target = match.group(1).upper() if match else None
+    references = {ref.upper() for ref in SQL_REFERENCE_PATTERN.findall(body)} - {target}
+    return target, references
+
+def parse_sql_config(sql_script):
+    return {key.lower(): value for key, value in SQL_CONFIG_PATTERN.findall(sql_script)}
+
+def load_sql_models(sql_folder):
+    models = {}
+    for sql_file in sorted(os.listdir(sql_folder)):
+        if not sql_file.lower().endswith('.sql'):
+            continue
+        model_name = sql_file.replace('.SQL', '').replace('.sql', '')
+        with open(os.path.join(sql_folder, sql_file), 'r') as f:
+            sql_script = f.read()
+        target, references = parse_sql_model(sql_script)
+        models[model_name] = {
+            "sql": sql_script,
+            "target": target,
+            "references": references,
+            "config": parse_sql_config(sql_script),
+            "sql_hash": hashlib.sha256(sql_script.encode()).hexdigest()
+        }
+    return models
+
+def get_incremental_tables(sql_folder):
+    if not os.path.isdir(sql_folder):
+        return []
+    return [
+        model["target"].split('.')[1]
+        for model in load_sql_models(sql_folder).values()
+        if model["target"] and model["config"].get("materialized", "").lower() == "incremental"
+    ]
+
+def run_incremental_model(conn, model, stored_hash=None):
+    target = model["target"]
+    config = model["config"]
+    if not table_exists(conn, *target.split('.')):
+        conn.execute(model["sql"])
+        logger.info(f"Built incremental model {target} in full")
+        return
+    if stored_hash != model["sql_hash"]:
+        # Merging only rewrites the latest partitions, so older rows would keep the previous SQL's results
+        conn.execute(model["sql"])
+        logger.info(f"SQL of {target} changed since its last build, rebuilt it in full")
+        return
+    body = SQL_COMMENT_PATTERN.sub(" ", model["sql"])
+    select_sql = SQL_SELECT_PATTERN.search(body).group(1).strip().rstrip(';')
+    unique_key = [key.strip() for key in config["unique_key"].split(',')]
+    change_column = config["change_column"]
+    model_columns = [row[0] for row in conn.execute(f"DESCRIBE {select_sql}").fetchall()]
+    target_columns = [row[0] for row in conn.execute(f"DESCRIBE {target}").fetchall()]
+    if model_columns != target_columns:
+        logger.info(f"Columns of {target} changed, rebuilding it in full")
+        conn.execute(model["sql"])
+        return
+    key_match = " AND ".join(f"t.{key} IS NOT DISTINCT FROM s.{key}" for key in unique_key)
+    merge_query = f"""
+    MERGE INTO {target} AS t
+    USING (
+        SELECT * FROM ({select_sql}) AS m
+        WHERE m.{change_column} IS NULL
+            OR m.{change_column} >= (SELECT MAX({change_column}) FROM {target})
+            OR (SELECT MAX({change_column}) FROM {target}) IS NULL
+    ) AS s
+    ON {key_match}
+    WHEN MATCHED THEN UPDATE
+    WHEN NOT MATCHED THEN INSERT BY NAME;
+    """
+    merged = conn.execute(merge_query).fetchone()[0]
+    logger.info(f"Merged {merged} rows into incremental model {target}")
+
+def build_sql_dag(models):
+    targets = {model["target"]: name for name, model in models.items() if model["target"]}
+    return {
+        name: {targets[ref] for ref in model["references"] if ref in targets and targets[ref] != name}
+        for name, model in models.items()
+    }
+
+def create_model_state(conn, schema):
+    conn.execute(f"""
+    CREATE TABLE IF NOT EXISTS {schema}.{MODEL_STATE_TABLE} (
+        target VARCHAR,
+        sql_hash VARCHAR,
+        updated_at TIMESTAMP
+    )
+    """)
+
+def get_model_hashes(conn, schemas):
+    hashes = {}
+    for schema in schemas:
+        create_model_state(conn, schema)
+        rows = conn.execute(f"SELECT target, sql_hash FROM {schema}.{MODEL_STATE_TABLE}").fetchall()
+        hashes.update(rows)
+    return hashes
+
+def record_model_hashes(conn, models, model_names):
+    for name in model_names:
+        target = models[name]["target"]
+        if target:
+            schema = target.split('.')[0]
+            create_model_state(conn, schema)
+            conn.execute(f"DELETE FROM {schema}.{MODEL_STATE_TABLE} WHERE target = ?", [target])
+            conn.execute(
+                f"INSERT INTO {schema}.{MODEL_STATE_TABLE} VALUES (?, ?, CURRENT_TIMESTAMP)",
+                [target, models[name]["sql_hash"]]
+            )
+
+def select_sql_models(conn, models, dependencies, changed_tables):
+    changed_tables = {table.upper() for table in changed_tables}
+    stored_hashes = get_model_hashes(conn, {model["target"].split('.')[0] for model in models.values() if model["target"]})
+    selected = set()
+    for name, model in models.items():
+        target = model["target"]
+        if model["references"] & changed_tables:
+            selected.add(name)
+        elif target and not table_exists(conn, *target.split('.')):
+            selected.add(name)
+        elif target and stored_hashes.get(target) != model["sql_hash"]:
+            logger.info(f"SQL of {name} changed since its last build, rebuilding it and its downstream models")
+            selected.add(name)
+    added = True
+    while added:
+        added = False
+        for name, upstream in dependencies.items():
+            if name not in selected and upstream & selected:
+                selected.add(name)
+                added = True
+    return selected
+
+def run_sql_dag(conn, models, dependencies, max_workers=SQL_TRANSFORM_WORKERS):
+    catalog = conn.execute("SELECT current_database()").fetchone()[0]
+    incremental = [name for name in dependencies if models[name]["config"].get("materialized", "").lower() == "incremental"]
+    stored_hashes = get_model_hashes(conn, {models[name]["target"].split('.')[0] for name in incremental})
+
+    def run_model(model_name):
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f"USE {catalog}")
+            model = models[model_name]
+            if model_name in incremental:
+                run_incremental_model(cursor, model, stored_hashes.get(model["target"]))
+            else:
+                cursor.execute(model["sql"])
+        finally:
+            cursor.close()
+
+    pending = {name: set(upstream) for name, upstream in dependencies.items()}
+    completed = []
+    failed = {}
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        running = {}
+        while pending or running:
+            ready = sorted(name for name, upstream in pending.items() if not upstream)
+            for name in ready:
+                del pending[name]
+                running[executor.submit(run_model, name)] = name
+            if not running:
+                raise ValueError(f"Circular dependency between SQL models: {sorted(pending)}")
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    future.result()
+                    completed.append(name)
+                    logger.info(f"Ran transformation for {name}")
+                    for upstream in pending.values():
+                        upstream.discard(name)
+                except Exception as e:
+                    failed[name] = e
+                    logger.error(f"Transformation {name} failed: {e}")
+                    blocked = {name}
+                    while True:
+                        downstream = {other for other, upstream in pending.items() if upstream & blocked}
+                        if not downstream:
+                            break
+                        for other in downstream:
+                            del pending[other]
+                            logger.warning(f"Skipping {other} because an upstream model failed")
+                        blocked |= downstream
+    record_model_hashes(conn, models, completed)
+    if failed:
+        raise RuntimeError(f"SQL transformations failed: {', '.join(sorted(failed))}")
+    return completed
+
+def sync_tables(conn, logger, source_folder, schema="RAW", mode=None, incremental_sources=INCREMENTAL_SOURCES, changed_tables=None):
     logger.info(f"Syncing tables from files in {source_folder} to schema {schema}")
     if source_folder and str(source_folder).startswith("s3://"):
         mode = "ingest"
@@ -169,8 +637,9 @@ def sync_tables(conn, logger, source_folder, schema="RAW", mode=None):
         mode = "transform"
     else:
         logger.error("Invalid source_folder or unable to determine mode.")
-        return
+        return []
 
+    refreshed_tables = []
     if mode == "ingest":
         file_list_query = f"SELECT * FROM glob('{source_folder}/*.parquet')"
         batched_files = conn.execute(file_list_query).fetchall()
@@ -182,35 +651,41 @@ def sync_tables(conn, logger, source_folder, schema="RAW", mode=None):
             file_name = os.path.basename(file_path).replace('.parquet', '')
             source_name = file_name.split('_data')[0].upper()
             table_name = f"{schema}.{source_name}"
-            query = f"""
-            CREATE OR REPLACE TABLE {table_name} AS
-            SELECT *,
-                '{file_name}' AS _source_file,
-                CURRENT_TIMESTAMP AS _ingestion_timestamp,
-                ROW_NUMBER() OVER () AS _record_id
-            FROM read_parquet('{file_path}');
-            """
-            conn.execute(query)
+            loaded_file, _ = get_ingest_state(conn, schema, source_name)
+            if loaded_file == file_name and table_exists(conn, schema, source_name):
+                logger.info(f"{table_name} is already loaded from {file_name}, skipping")
+                continue
+            if source_name in incremental_sources:
+                key_column, change_column = incremental_sources[source_name]
+                merge_incremental_source(conn, schema, source_name, file_path, file_name, key_column, change_column)
+            else:
+                load_full_source(conn, table_name, file_path, file_name)
+                set_ingest_state(conn, schema, source_name, file_name, None)
+            refreshed_tables.append(table_name)
             logger.info(f"Successfully created or updated {table_name}")
     elif mode == "transform":
-        sql_files = [f for f in os.listdir(source_folder) if f.lower().endswith('.sql')]
-        logger.info(f"Total SQL files found: {len(sql_files)} in {source_folder}")
-        if not sql_files:
+        models = load_sql_models(source_folder)
+        logger.info(f"Total SQL files found: {len(models)} in {source_folder}")
+        if not models:
             logger.warning(f"No .SQL files found in {source_folder}")
-        for sql_file in sql_files:
-            table_name = sql_file.replace('.SQL', '').replace('.sql', '')
-            sql_path = os.path.join(source_folder, sql_file)
-            with open(sql_path, 'r') as f:
-                sql_script = f.read()
-            conn.execute(sql_script)
-            logger.info(f"Ran transformation for {table_name}")
+        dependencies = build_sql_dag(models)
+        if changed_tables is not None:
+            selected = select_sql_models(conn, models, dependencies, changed_tables)
+            for name in sorted(set(models) - selected):
+                logger.info(f"Skipping {name}, neither its SQL nor its upstream tables changed")
+            dependencies = {name: upstream & selected for name, upstream in dependencies.items() if name in selected}
+        completed = run_sql_dag(conn, models, dependencies)
+        refreshed_tables.extend(models[name]["target"] for name in completed if models[name]["target"])
     else:
         logger.error("Invalid mode or missing sql_folder for transformation.")
+    return refreshed_tables
 
 @task
-def cleanup_db_folders(folder):
+def cleanup_db_folders(folder, exclude=()):
     for subfolder in os.listdir(folder):
         subfolder_path = os.path.join(folder, subfolder)
+        if subfolder in exclude:
+            continue
         if os.path.isdir(subfolder_path):
             file_paths = [
                 os.path.join(subfolder_path, f)
@@ -0,0 +1,334 @@
+import io
+import duckdb
+import pytest
+import pyarrow as pa
+import pyarrow.parquet as pq
+from concurrent.futures import ThreadPoolExecutor
+from fastapi.testclient import TestClient
+from api import api_server
+from src.db_pool import CursorPool
+from src.response_cache import ResponseCache
+from src.pagination import keyset_predicate, encode_cursor, decode_cursor
+from src.search_index import contains_filter
+
+def fake_ducklake_init(conn, data_path, catalog_path):
+    conn.execute("ATTACH ':memory:' AS my_ducklake")
+    conn.execute("USE my_ducklake")
+    conn.execute("CREATE SCHEMA CURATED")
+    conn.execute("CREATE SCHEMA STAGED")
+    conn.execute("""
+        CREATE TABLE CURATED.NPS_PARK_PROFILE AS
+        SELECT * FROM (VALUES
+            ('yell', 'Yellowstone', 'WY,MT,ID', 44.6, -110.5, 'National Park'),
+            ('grte', 'Grand Teton', 'WY', 43.8, -110.7, 'National Park'),
+            ('acad', 'Acadia', 'ME', 44.4, -68.2, 'National Park')
+        ) t(park_code, name, states, latitude, longitude, designation)
+    """)
+    conn.execute("""
+        CREATE TABLE STAGED.STATE_PARKS AS
+        SELECT * FROM (VALUES (1, 'Sinks Canyon', 'Lander', 'WY', '42.75', '-108.8'))
+        t(id, park_name, city, state, latitude, longitude)
+    """)
+    conn.execute("""
+        CREATE TABLE CURATED.PARK_ALERTS AS
+        SELECT * FROM (VALUES
+            ('Yellowstone', 'yell', 'a1', 'Road closed', 'Closure', 1.25::DECIMAL(6, 2), 'nan'::DOUBLE),
+            ('Yellowstone', 'yell', 'a2', NULL, 'Closure', NULL, 2.0)
+        ) t(park_name, park_code, alert_id, alert_title, alert_category, fee, score)
+    """)
+    conn.execute("""
+        CREATE TABLE CURATED.PARK_USAGE_SUMMARIZED AS
+        SELECT 'p' || (i % 7) AS park_id, 'Park ' || (i % 7) AS park_name, 2000 + i // 7 AS Year,
+               CASE WHEN i % 5 = 0 THEN NULL ELSE (i * 37) % 11 END AS total_recreation_visits,
+               i AS total_non_recreation_visits, i % 3 AS total_concessioner_camping,
+               i % 4 AS total_tent_campers, i % 2 AS total_rv_campers
+        FROM range(70) t(i)
+    """)
+    conn.execute("""
+        CREATE TABLE CURATED.NPS_PARK_USAGE_ANNUAL AS
+        SELECT 'p' || (i % 3) AS park_id, ['yell', 'grte', 'acad'][i % 3 + 1] AS park_code, 'Park ' || (i % 3) AS park_name,
+               2000 + i // 36 AS Year, (i // 3) % 12 + 1 AS Month, i * 10 AS RecreationVisits
+        FROM range(144) t(i)
+        UNION ALL SELECT 'p3', 'zion', 'Zion', NULL, NULL, NULL
+        UNION ALL SELECT 'p0', 'yell', 'Park 0', 2001, 0, 5
+    """)
+    conn.execute("""
+        CREATE TABLE CURATED.NATL_LANDMARKS AS
+        SELECT CASE WHEN i % 3 = 0 THEN 'Wyoming' WHEN i % 3 = 1 THEN 'Montana' ELSE 'Not Listed' END AS state,
+               CASE WHEN i % 3 = 0 THEN 'WY' WHEN i % 3 = 1 THEN 'MT' END AS state_abbr,
+               CASE WHEN i % 4 = 0 THEN 'SITE' ELSE 'BUILDING' END AS category_of_property,
+               CASE WHEN i % 5 = 0 THEN 'National' ELSE 'Local' END AS level_of_significance,
+               i AS id, 'Landmark ' || i AS property_name, 'City' AS city, 30.0 + i / 1000 AS latitude, -90.0 AS longitude,
+               CASE WHEN i % 2 = 0 THEN 'city' ELSE 'state' END AS geocode_precision
+        FROM range(60) t(i)
+    """)
+    conn.execute("""
+        CREATE TABLE STAGED.PARKS AS
+        SELECT * FROM (VALUES ('id-yell', 'yell', 'Yellowstone'), ('id-grte', 'grte', 'Grand Teton')) t(id, park_code, name)
+    """)
+    conn.execute("""
+        CREATE TABLE STAGED.ADDRESSES AS
+        SELECT * FROM (VALUES ('id-yell', 'Mammoth', 'WY'), ('id-yell', 'Gardiner', 'MT'), ('id-yell', 'Cody', 'WY'),
+                              ('id-grte', 'Moose', 'WY'), ('id-grte', 'Jackson', 'WY'))
+        t(park_id, city, state)
+    """)
+    conn.execute("""
+        CREATE TABLE STAGED.NATL_LANDMARKS AS
+        SELECT i AS id, 'Landmark ' || i AS property_name, 'street' AS street_and_number, 'City' AS city,
+               CASE WHEN i % 2 = 0 THEN 'Wyoming' ELSE ' montana ' END AS state, 'County' AS county, DATE '2000-01-01' AS listed_date,
+               'Local' AS level_of_significance, 'ARCHITECTURE' AS area_of_significance, 'BUILDING' AS category_of_property
+        FROM range(25) t(i)
+    """)
+    for layer, model in [("staged", "STATE_ABBREVIATIONS"), ("staged", "STAGED_PARK_STATES"), ("curated", "NPS_PARKS_TO_LANDMARKS"),
+                         ("curated", "NATL_LANDMARKS_SUMMARY"), ("curated", "PARK_USAGE_YEARLY"), ("curated", "PARK_USAGE_TOP_PARKS"), ("curated", "PARKS_BY_STATE")]:
+        with open(f"sql/{layer}/{model}.SQL") as f:
+            conn.execute(f.read())
+    return conn
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(api_server, "duckdb_setup", lambda read_only=False: duckdb.connect())
+    monkeypatch.setattr(api_server, "ducklake_init", fake_ducklake_init)
+    monkeypatch.setattr(api_server, "API_POOL_SIZE", 2)
+    with TestClient(api_server.app) as test_client:
+        yield test_client
+
+def test_cursor_pool_hands_out_separate_cursors():
+    conn = duckdb.connect()
+    conn.execute("ATTACH ':memory:' AS my_ducklake")
+    conn.execute("CREATE TABLE my_ducklake.t AS SELECT 1 AS x")
+    pool = CursorPool(conn, 2, timeout=0.1)
+    with pool.cursor() as first, pool.cursor() as second:
+        assert first is not second
+        assert first.execute("SELECT x FROM t").fetchone() == (1,)
+        with pytest.raises(TimeoutError):
+            with pool.cursor():
+                pass
+    with pool.cursor() as cursor:
+        assert cursor.execute("SELECT current_database()").fetchone() == ("my_ducklake",)
+    pool.close()
+
+def test_parks_endpoint_serves_concurrent_requests(client):
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        responses = list(executor.map(lambda _: client.get("/parks", params={"state": "wy"}), range(12)))
+    for response in responses:
+        assert response.status_code == 200
+        assert sorted(row["park_code"] for row in response.json()) == ["grte", "yell"]
+
+def test_nearby_endpoint(client):
+    response = client.get("/nearby", params={"lat": 44.0, "lon": -110.6, "radius": 200})
+    assert [(row["kind"], row["id"]) for row in response.json()] == [
+        ("park", "grte"), ("park", "yell"), ("state_park", "1")
+    ]
+    response = client.get("/nearby", params={"lat": 44.0, "lon": -70.0, "k": 1, "kind": "park"})
+    assert [row["id"] for row in response.json()] == ["acad"]
+    response = client.get("/nearby", params={"lat": 30.0, "lon": -90.0, "radius": 50, "kind": "landmark"})
+    assert sorted(int(row["id"]) for row in response.json()) == list(range(0, 60, 2))
+    assert "error" in client.get("/nearby", params={"lat": 0, "lon": 0, "kind": "volcano"}).json()
+
+def test_nearby_indexes_follow_new_snapshots(client, monkeypatch):
+    snapshot = {"id": 1}
+    monkeypatch.setattr(api_server, "current_snapshot_id", lambda cursor: snapshot["id"])
+    monkeypatch.setattr(api_server.response_cache, "snapshot_ttl", 0)
+    params = {"lat": 36.1, "lon": -112.1, "radius": 10, "kind": "park"}
+    assert client.get("/nearby", params=params).json() == []
+    with api_server.app.state.pool.cursor() as cursor:
+        cursor.execute("INSERT INTO CURATED.NPS_PARK_PROFILE VALUES ('grca', 'Grand Canyon', 'AZ', 36.1, -112.1, 'National Park')")
+    assert client.get("/nearby", params=params).json() == []
+    snapshot["id"] = 2
+    assert [row["id"] for row in client.get("/nearby", params=params).json()] == ["grca"]
+
+def test_search_index_availability_follows_new_snapshots(client, monkeypatch):
+    snapshot = {"id": 1}
+    monkeypatch.setattr(api_server, "current_snapshot_id", lambda cursor: snapshot["id"])
+    monkeypatch.setattr(api_server.response_cache, "snapshot_ttl", 0)
+    client.get("/parks")
+    assert api_server.search_index["available"] is False
+    with api_server.app.state.pool.cursor() as cursor:
+        cursor.execute("CREATE TABLE CURATED.SEARCH_TERMS (table_name VARCHAR, column_name VARCHAR, term VARCHAR)")
+        cursor.execute("CREATE TABLE CURATED.SEARCH_TRIGRAMS (table_name VARCHAR, column_name VARCHAR, trigram VARCHAR, term VARCHAR)")
+    client.get("/parks")
+    assert api_server.search_index["available"] is False
+    snapshot["id"] = 2
+    client.get("/parks")
+    assert api_server.search_index["available"] is True
+
+def test_alerts_response_formats(client):
+    response = client.get("/parks/alerts")
+    assert response.headers["content-type"] == "application/json"
+    assert response.json() == [
+        {"park_name": "Yellowstone", "park_code": "yell", "alert_id": "a1", "alert_title": "Road closed", "alert_category": "Closure", "fee": 1.25, "score": None}
+    ]
+    response = client.get("/parks/alerts", headers={"Accept": "application/vnd.apache.arrow.stream"})
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.column("alert_title").to_pylist() == ["Road closed"]
+    response = client.get("/parks/alerts", headers={"Accept": "application/vnd.apache.parquet"})
+    assert pq.read_table(io.BytesIO(response.content)).num_rows == 1
+
+def test_response_cache_evicts_least_recently_used():
+    cache = ResponseCache(max_entries=2, max_bytes=10)
+    cache.put("a", b"1234", 200, {})
+    cache.put("b", b"1234", 200, {})
+    assert cache.get("a") is not None
+    cache.put("c", b"1234", 200, {})
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    cache.put("d", b"123456789", 200, {})
+    assert len(cache) == 1
+
+def test_responses_cached_until_snapshot_changes(client, monkeypatch):
+    snapshot = {"id": 1}
+    monkeypatch.setattr(api_server, "current_snapshot_id", lambda cursor: snapshot["id"])
+    monkeypatch.setattr(api_server.response_cache, "snapshot_ttl", 0)
+    first = client.get("/parks", params={"state": "wy", "designation": "park"})
+    second = client.get("/parks", params={"designation": "park", "state": "wy"})
+    assert first.headers["x-cache"] == "MISS"
+    assert second.headers["x-cache"] == "HIT"
+    assert second.content == first.content
+    assert second.headers["content-type"] == "application/json"
+    arrow = client.get("/parks", params={"state": "wy", "designation": "park"}, headers={"Accept": "application/vnd.apache.arrow.stream"})
+    assert arrow.headers["x-cache"] == "MISS"
+    snapshot["id"] = 2
+    assert client.get("/parks", params={"state": "wy", "designation": "park"}).headers["x-cache"] == "MISS"
+
+def test_keyset_predicate_is_null_safe():
+    conn = duckdb.connect()
+    conn.execute("CREATE TABLE t AS SELECT * FROM (VALUES (1, 'a'), (1, NULL), (2, 'b'), (NULL, 'c'), (NULL, NULL), (2, NULL)) v(x, y)")
+    keys = [("x", True), ("y", False)]
+    ordered = conn.execute("SELECT x, y FROM t ORDER BY x DESC NULLS LAST, y ASC NULLS LAST").fetchall()
+    for position, row in enumerate(ordered):
+        predicate, params = keyset_predicate(keys, list(row))
+        after = conn.execute(f"SELECT x, y FROM t WHERE {predicate} ORDER BY x DESC NULLS LAST, y ASC NULLS LAST", params).fetchall()
+        assert after == ordered[position + 1:]
+    assert decode_cursor(encode_cursor([1, None]), 2) == [1, None]
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor", 2)
+
+def test_usage_pages_cover_every_row_once(client):
+    rows = []
+    params = {"limit": 9}
+    pages = 0
+    while True:
+        response = client.get("/parks/usage", params=params)
+        page = response.json()
+        assert len(page) <= 9
+        rows.extend(page)
+        pages += 1
+        next_cursor = response.headers.get("x-next-cursor")
+        if not next_cursor:
+            break
+        params["cursor"] = next_cursor
+    assert pages == 8
+    assert len({(row["park_id"], row["Year"]) for row in rows}) == 70
+    visits = [row["total_recreation_visits"] for row in rows]
+    non_null = [v for v in visits if v is not None]
+    assert non_null == sorted(non_null, reverse=True)
+    assert visits[len(non_null):] == [None] * (70 - len(non_null))
+    assert client.get("/parks/usage", params={"limit": 100000}).status_code == 422
+
+def test_park_landmark_pages_cover_every_pair_once(client):
+    rows = []
+    params = {"limit": 4}
+    while True:
+        response = client.get("/parks/landmarks", params=params)
+        rows.extend(response.json())
+        next_cursor = response.headers.get("x-next-cursor")
+        if not next_cursor:
+            break
+        params["cursor"] = next_cursor
+    pairs = [(row["park_code"], row["landmark_id"]) for row in rows]
+    assert len(pairs) == len(set(pairs)) == 25 + 13
+    assert pairs == sorted(pairs)
+
+def test_export_streams_curated_tables(client):
+    response = client.get("/export/park_usage_summarized")
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert len(response.text.splitlines()) == 70
+    response = client.get("/export/PARK_USAGE_SUMMARIZED", params={"format": "csv"})
+    assert response.text.splitlines()[0] == (
+        '"park_id","park_name","Year","total_recreation_visits","total_non_recreation_visits",'
+        '"total_concessioner_camping","total_tent_campers","total_rv_campers"'
+    )
+    response = client.get("/export/PARK_USAGE_SUMMARIZED", params={"format": "parquet"})
+    assert pq.read_table(io.BytesIO(response.content)).num_rows == 70
+    assert "error" in client.get("/export/STATE_PARKS").json()
+    assert "error" in client.get("/export/PARK_ALERTS", params={"format": "xml"}).json()
+
+def test_contains_filter_matches_like_scan():
+    conn = duckdb.connect()
+    conn.execute("CREATE SCHEMA CURATED")
+    conn.execute("""
+        CREATE TABLE CURATED.NATL_LANDMARKS AS
+        SELECT * FROM (VALUES ('Cheyenne'), ('Casper'), ('Jackson Hole'), ('Laramie'), ('Sheridan'), ('Rock_Springs'), (NULL)) t(city)
+    """)
+    conn.execute("""
+        CREATE TABLE CURATED.SEARCH_TERMS AS
+        SELECT DISTINCT 'NATL_LANDMARKS' AS table_name, 'city' AS column_name, city AS term, LOWER(city) AS term_lower
+        FROM CURATED.NATL_LANDMARKS WHERE city IS NOT NULL
+    """)
+    with open("sql/curated/SEARCH_TRIGRAMS.SQL") as f:
+        conn.execute(f.read())
+    for term in ["e", "an", "HOLE", "sheri", "ar", "k_s", "%", "zzz", "ridan"]:
+        expected = conn.execute("SELECT city FROM CURATED.NATL_LANDMARKS WHERE LOWER(city) LIKE ? ORDER BY city", [f"%{term.lower()}%"]).fetchall()
+        condition, params = contains_filter("NATL_LANDMARKS", "city", term)
+        found = conn.execute(f"SELECT city FROM CURATED.NATL_LANDMARKS WHERE {condition} ORDER BY city", params).fetchall()
+        assert found == expected, term
+
+def test_landmarks_summary_matches_group_by(client):
+    conn = duckdb.connect()
+    fake_ducklake_init(conn, None, None)
+    summary = client.get("/landmarks/summary", params={"state": "on"}).json()
+    by_state = conn.execute("""
+        SELECT state, state_abbr, COUNT(*) FROM CURATED.NATL_LANDMARKS
+        WHERE LOWER(state) LIKE '%on%' GROUP BY ALL
+    """).fetchall()
+    assert sorted((r["state"], r["state_abbr"], r["count"]) for r in summary["by_state"]) == sorted(by_state)
+    by_level = conn.execute("""
+        SELECT state, state_abbr, level_of_significance, COUNT(*) FROM CURATED.NATL_LANDMARKS
+        WHERE LOWER(state) LIKE '%on%' GROUP BY ALL ORDER BY state, COUNT(*) DESC
+    """).fetchall()
+    assert [(r["state"], r["state_abbr"], r["level_of_significance"], r["count"]) for r in summary["by_level"]] == by_level
+    assert {r["category_of_property"] for r in summary["by_category"]} == {"BUILDING", "SITE"}
+
+def test_stats_endpoints_match_client_side_aggregation(client):
+    conn = duckdb.connect()
+    fake_ducklake_init(conn, None, None)
+    usage = conn.execute("SELECT * FROM CURATED.PARK_USAGE_SUMMARIZED").df()
+    totals = usage.groupby("Year")["total_recreation_visits"].sum()
+    yoy = client.get("/stats/yoy", params={"year_from": 2004, "year_to": 2006}).json()
+    assert [row["Year"] for row in yoy] == [2004, 2005, 2006]
+    for row in yoy:
+        assert row["total_recreation_visits"] == totals[row["Year"]]
+        expected = (totals[row["Year"]] - totals[row["Year"] - 1]) / totals[row["Year"] - 1] * 100
+        assert row["pct_change_yoy"] == round(expected, 2)
+    top = client.get("/stats/top-parks", params={"year": 2003, "n": 3}).json()
+    expected_top = usage[usage["Year"] == 2003].dropna(subset=["total_recreation_visits"])
+    expected_top = expected_top.sort_values(["total_recreation_visits", "park_id"], ascending=[False, True]).head(3)
+    assert [row["park_id"] for row in top] == expected_top["park_id"].tolist()
+    assert [row["visit_rank"] for row in top] == [1, 2, 3]
+    assert {row["Year"] for row in client.get("/stats/top-parks").json()} == {2009}
+    by_state = client.get("/stats/parks-by-state").json()
+    assert by_state == [{"state": "WY", "num_parks": 2}, {"state": "ID", "num_parks": 1}, {"state": "ME", "num_parks": 1}, {"state": "MT", "num_parks": 1}]
+
+def test_monthly_usage_filters_by_park_codes_and_year_range(client):
+    params = {"granularity": "monthly", "park_code": ["yell", "acad"], "year_from": 2001, "year_to": 2002}
+    rows = client.get("/parks/usage", params=params).json()
+    assert len(rows) == 2 * 12 * 2
+    assert {row["park_code"] for row in rows} == {"yell", "acad"}
+    assert {row["Year"] for row in rows} == {2001, 2002}
+    assert all(1 <= row["Month"] <= 12 for row in rows)
+    assert len(client.get("/parks/usage", params={"granularity": "monthly"}).json()) == 144
+    assert client.get("/parks/usage", params={"park_code": "yell"}).status_code == 422
+
+def test_metrics_record_request_stages(client, monkeypatch):
+    monkeypatch.setattr("src.api_responses.API_SLOW_QUERY_SECONDS", 0)
+    monkeypatch.setattr("src.api_responses.API_EXPLAIN_SLOW_QUERIES", True)
+    response = client.get("/parks", params={"state": "wy"})
+    assert "sql;dur=" in response.headers["server-timing"]
+    metrics = client.get("/metrics").text
+    assert 'nomadiq_api_request_seconds_count{endpoint="/parks",method="GET",status="200",cache="none"}' in metrics
+    assert 'nomadiq_api_stage_seconds_count{endpoint="/parks",stage="sql"}' in metrics
+    assert 'nomadiq_api_response_rows_bucket{endpoint="/parks",le="10"}' in metrics
+    slow = client.get("/metrics/slow-queries").json()
+    assert slow and "NPS_PARK_PROFILE" in slow[-1]["sql"]
+    assert slow[-1]["plan"]
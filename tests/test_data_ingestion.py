@@ -32,7 +32,8 @@ def test_save_to_minio_error(monkeypatch):
             raise Exception("MinIO error")
     monkeypatch.setattr('src.utilities.get_minio_client', lambda: DummyMinio())
     buffer = io.BytesIO(b"test")
-    save_to_minio(buffer, 'bucket', 'file.parquet')
+    with pytest.raises(Exception):
+        save_to_minio(buffer, 'bucket', 'file.parquet')
 
 def test_fetch_all_nps_data(monkeypatch):
     class DummyResponse:
@@ -48,3 +49,121 @@ def test_fetch_all_nps_data(monkeypatch):
     result = fetch_all_nps_data('key', 'url')
     assert isinstance(result, list)
     assert result[0]['a'] == 1
+
+def test_get_nps_endpoints_from_config(monkeypatch):
+    from src.data_ingestion import get_nps_endpoints
+    monkeypatch.setenv("NPS_PARKS_ENDPOINT", "http://nps/parks")
+    monkeypatch.setenv("NPS_CAMPGROUNDS_ENDPOINT", "http://nps/campgrounds")
+    monkeypatch.delenv("NPS_EVENTS_ENDPOINT", raising=False)
+    endpoints = get_nps_endpoints("parks, campgrounds,events")
+    assert endpoints == {"parks": "http://nps/parks", "campgrounds": "http://nps/campgrounds"}
+
+def test_data_ingestion_runs_each_endpoint(monkeypatch):
+    from src import data_ingestion
+    uploads = []
+    monkeypatch.setattr(data_ingestion, "get_nps_endpoints", lambda: {"parks": "http://nps/parks", "alerts": "http://nps/alerts"})
+    monkeypatch.setattr(data_ingestion, "iter_nps_pages", lambda api_key, url: iter([[{"url": url}]]))
+    monkeypatch.setattr(data_ingestion, "stream_json_to_parquet", lambda pages, sink: [record for page in pages for record in page])
+    monkeypatch.setattr(data_ingestion, "save_to_minio", lambda data, bucket, filename: uploads.append((filename, data[0]["url"])))
+    data_ingestion.data_ingestion()
+    assert sorted(uploads) == [("alerts_data.parquet", "http://nps/alerts"), ("parks_data.parquet", "http://nps/parks")]
+
+def test_data_ingestion_fails_when_an_endpoint_fails(monkeypatch):
+    from src import data_ingestion
+    uploads = []
+    def fake_pages(api_key, url):
+        if "alerts" in url:
+            raise requests.HTTPError("503 Service Unavailable")
+        return iter([[{"url": url}]])
+    monkeypatch.setattr(data_ingestion, "get_nps_endpoints", lambda: {"parks": "http://nps/parks", "alerts": "http://nps/alerts"})
+    monkeypatch.setattr(data_ingestion, "iter_nps_pages", fake_pages)
+    monkeypatch.setattr(data_ingestion, "stream_json_to_parquet", lambda pages, sink: [record for page in pages for record in page])
+    monkeypatch.setattr(data_ingestion, "save_to_minio", lambda data, bucket, filename: uploads.append(filename))
+    with pytest.raises(RuntimeError, match="alerts"):
+        data_ingestion.data_ingestion()
+    assert uploads == ["parks_data.parquet"]
+
+def test_stream_json_to_parquet_row_groups():
+    import pyarrow.parquet as pq
+    from src.utilities import stream_json_to_parquet
+    pages = iter([[{'a': 1, 'b': {'c': 2}}], [{'a': 2}], [{'a': 3, 'b': {'c': 4}}]])
+    buffer = stream_json_to_parquet(pages, rows_per_group=1)
+    parquet_file = pq.ParquetFile(buffer)
+    assert parquet_file.metadata.num_row_groups == 3
+    buffer.seek(0)
+    df = pl.read_parquet(buffer)
+    assert df.columns == ['a', 'b.c']
+    assert df['a'].to_list() == [1, 2, 3]
+    assert df['b.c'].to_list() == [2, None, 4]
+
+def test_stream_json_to_parquet_empty():
+    from src.utilities import stream_json_to_parquet
+    with pytest.raises(ValueError):
+        stream_json_to_parquet(iter([[]]))
+
+def test_stream_json_to_parquet_unifies_batch_schemas():
+    from src.utilities import stream_json_to_parquet
+    pages = iter([[{'a': 1, 'x': None}], [{'a': 2, 'x': 'late', 'b': {'c': 5}}], [{'a': 2.5}]])
+    df = pl.read_parquet(stream_json_to_parquet(pages, rows_per_group=1))
+    assert df.columns == ['a', 'x', 'b.c']
+    assert df['a'].to_list() == [1.0, 2.0, 2.5]
+    assert df['x'].to_list() == [None, 'late', None]
+    assert df['b.c'].to_list() == [None, 5, None]
+    with pytest.raises(Exception):
+        stream_json_to_parquet(iter([[{'a': 1}], [{'a': 'text'}]]), rows_per_group=1)
+
+def test_iter_nps_pages_bounds_pages_in_flight(monkeypatch):
+    from src import utilities
+    fetched = []
+    def fake_fetch(session, api_key, base_url, start, batch_size):
+        fetched.append(start)
+        return {"data": [start], "total": 20}
+    monkeypatch.setattr(utilities, "fetch_nps_page", fake_fetch)
+    pages = utilities.iter_nps_pages("key", "url", max_workers=3, batch_size=1)
+    consumed = []
+    for page in pages:
+        consumed.extend(page)
+        assert len(fetched) <= len(consumed) + 3
+    assert consumed == list(range(20))
+
+def test_save_to_minio_streams_original_buffer(monkeypatch):
+    calls = []
+    class DummyMinio:
+        def list_objects(self, bucket, prefix):
+            return []
+        def put_object(self, bucket, name, data, **kwargs):
+            calls.append((bucket, name, data, kwargs))
+    monkeypatch.setattr('src.utilities.get_minio_client', lambda: DummyMinio())
+    buffer = io.BytesIO(b"parquet-bytes")
+    buffer.seek(4)
+    save_to_minio(buffer, 'bucket', 'parks_data.parquet', part_size=5 * 1024 * 1024)
+    bucket, name, data, kwargs = calls[0]
+    assert bucket == 'bucket'
+    assert name.startswith('parks_data_') and name.endswith('.parquet')
+    assert data is buffer
+    assert kwargs['length'] == len(b"parquet-bytes")
+    assert kwargs['part_size'] == 5 * 1024 * 1024
+
+def test_save_to_minio_skips_unchanged_content(monkeypatch):
+    from src.utilities import compute_content_hash
+    buffer = io.BytesIO(b"same-bytes")
+    content_hash = compute_content_hash(buffer)
+    class DummyObject:
+        def __init__(self, name):
+            self.object_name = name
+    class DummyStat:
+        metadata = {"x-amz-meta-content-sha256": content_hash}
+    class DummyMinio:
+        def __init__(self):
+            self.stat_calls = []
+        def list_objects(self, bucket, prefix):
+            return [DummyObject(f"{prefix}20250101_000000.parquet"), DummyObject(f"{prefix}20250102_000000.parquet")]
+        def stat_object(self, bucket, name):
+            self.stat_calls.append(name)
+            return DummyStat()
+        def put_object(self, *args, **kwargs):
+            raise AssertionError("unchanged content should not be uploaded")
+    client = DummyMinio()
+    monkeypatch.setattr('src.utilities.get_minio_client', lambda: client)
+    assert save_to_minio(buffer, 'bucket', 'parks_data.parquet') == "skipped"
+    assert client.stat_calls == ["parks_data_20250102_000000.parquet"]
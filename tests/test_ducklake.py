@@ -67,4 +67,190 @@ def test_duckdb_install_extension(tmp_path, monkeypatch):
     db_path = tmp_path / "test_duckdb_install_extension.db"
     original_connect = duckdb.connect
     monkeypatch.setattr("duckdb.connect", lambda *args, **kwargs: original_connect(str(db_path)))
-    duckdb_setup()
\ No newline at end of file
+    duckdb_setup()
+
+def test_merge_incremental_source_applies_changes(tmp_path):
+    from src.utilities import merge_incremental_source
+    conn = duckdb.connect()
+    conn.execute("CREATE SCHEMA RAW")
+    first = tmp_path / "alerts_data_20250101_000000.parquet"
+    second = tmp_path / "alerts_data_20250102_000000.parquet"
+    conn.execute(f"""
+    COPY (SELECT * FROM (VALUES
+        ('a1', 'Road closed', '2025-01-01 08:00:00'),
+        ('a2', 'Fire danger', '2025-01-01 09:00:00'),
+        ('a3', 'Trail open', '2025-01-01 10:00:00')
+    ) AS t(id, title, lastIndexedDate)) TO '{first}' (FORMAT PARQUET)
+    """)
+    conn.execute(f"""
+    COPY (SELECT * FROM (VALUES
+        ('a1', 'Road closed', '2025-01-01 08:00:00'),
+        ('a2', 'Fire danger lifted', '2025-01-02 07:00:00'),
+        ('a4', 'Bear activity', '2025-01-02 08:00:00')
+    ) AS t(id, title, lastIndexedDate)) TO '{second}' (FORMAT PARQUET)
+    """)
+    merge_incremental_source(conn, "RAW", "ALERTS", str(first), first.stem, "id", "lastIndexedDate")
+    merge_incremental_source(conn, "RAW", "ALERTS", str(second), second.stem, "id", "lastIndexedDate")
+    rows = conn.execute("SELECT id, title, _source_file FROM RAW.ALERTS ORDER BY id").fetchall()
+    assert rows == [
+        ("a1", "Road closed", first.stem),
+        ("a2", "Fire danger lifted", second.stem),
+        ("a4", "Bear activity", second.stem),
+    ]
+    record_ids = [r[0] for r in conn.execute("SELECT _record_id FROM RAW.ALERTS").fetchall()]
+    assert len(set(record_ids)) == len(record_ids)
+    state = conn.execute("SELECT source_file, high_water_mark FROM RAW.INGEST_STATE WHERE source_name = 'ALERTS'").fetchall()
+    assert len(state) == 1
+    assert state[0][0] == second.stem
+    assert str(state[0][1]) == "2025-01-02 08:00:00"
+
+def test_merge_incremental_source_inserts_new_ids_regardless_of_change_column(tmp_path):
+    from src.utilities import merge_incremental_source
+    from src.data_validation import run_all_validations
+    conn = duckdb.connect()
+    conn.execute("CREATE SCHEMA RAW")
+    first = tmp_path / "alerts_data_20250101_000000.parquet"
+    second = tmp_path / "alerts_data_20250102_000000.parquet"
+    conn.execute(f"""
+    COPY (SELECT * FROM (VALUES ('a1', 'Road closed', '2025-01-02 08:00:00'))
+    AS t(id, title, lastIndexedDate)) TO '{first}' (FORMAT PARQUET)
+    """)
+    conn.execute(f"""
+    COPY (SELECT * FROM (VALUES
+        ('a1', 'Road closed', '2025-01-02 08:00:00'),
+        ('a2', 'Backdated alert', '2024-12-31 00:00:00'),
+        ('a3', 'Undated alert', 'unknown')
+    ) AS t(id, title, lastIndexedDate)) TO '{second}' (FORMAT PARQUET)
+    """)
+    merge_incremental_source(conn, "RAW", "ALERTS", str(first), first.stem, "id", "lastIndexedDate")
+    merge_incremental_source(conn, "RAW", "ALERTS", str(second), second.stem, "id", "lastIndexedDate")
+    rows = conn.execute("SELECT id, _source_file FROM RAW.ALERTS ORDER BY id").fetchall()
+    assert rows == [("a1", first.stem), ("a2", second.stem), ("a3", second.stem)]
+    results = run_all_validations(conn)
+    alert_unique = results.filter((results["table"] == "alerts") & (results["rule"] == "id unique"))
+    assert alert_unique["details"].to_list() == ["0 duplicates"]
+    assert conn.execute("SELECT COUNT(*) FROM RAW.ALERTS").fetchone()[0] == 3
+
+def test_sync_tables_transform_respects_dependencies(tmp_path):
+    from src.utilities import sync_tables
+    from src.logger import logger_setup
+    sql_folder = tmp_path / "curated"
+    sql_folder.mkdir()
+    (sql_folder / "A_SUMMARY.SQL").write_text(
+        "CREATE OR REPLACE TABLE CURATED.SUMMARY AS SELECT COUNT(*) AS n FROM CURATED.DETAIL;"
+    )
+    (sql_folder / "B_DETAIL.SQL").write_text(
+        "-- reads from STAGED.SOURCE\nCREATE OR REPLACE TABLE CURATED.DETAIL AS SELECT * FROM STAGED.SOURCE s JOIN STAGED.LOOKUP l ON s.id = l.id;"
+    )
+    (sql_folder / "C_OTHER.SQL").write_text(
+        "CREATE OR REPLACE TABLE CURATED.OTHER AS SELECT * FROM STAGED.LOOKUP;"
+    )
+    conn = duckdb.connect()
+    conn.execute("CREATE SCHEMA STAGED; CREATE SCHEMA CURATED")
+    conn.execute("CREATE TABLE STAGED.SOURCE AS SELECT range AS id FROM range(3)")
+    conn.execute("CREATE TABLE STAGED.LOOKUP AS SELECT range AS id FROM range(2)")
+    logger = logger_setup("test_transform.log")
+
+    refreshed = sync_tables(conn, logger, str(sql_folder), schema="CURATED", mode="transform")
+    assert sorted(refreshed) == ["CURATED.DETAIL", "CURATED.OTHER", "CURATED.SUMMARY"]
+    assert refreshed.index("CURATED.DETAIL") < refreshed.index("CURATED.SUMMARY")
+    assert conn.execute("SELECT n FROM CURATED.SUMMARY").fetchone()[0] == 2
+
+    refreshed = sync_tables(conn, logger, str(sql_folder), schema="CURATED", mode="transform", changed_tables=["STAGED.SOURCE"])
+    assert sorted(refreshed) == ["CURATED.DETAIL", "CURATED.SUMMARY"]
+
+def test_sync_tables_transform_rebuilds_models_whose_sql_changed(tmp_path):
+    from src.utilities import sync_tables
+    from src.logger import logger_setup
+    sql_folder = tmp_path / "curated"
+    sql_folder.mkdir()
+    (sql_folder / "A_DETAIL.SQL").write_text("CREATE OR REPLACE TABLE CURATED.DETAIL AS SELECT id FROM STAGED.SOURCE;")
+    (sql_folder / "B_SUMMARY.SQL").write_text("CREATE OR REPLACE TABLE CURATED.SUMMARY AS SELECT COUNT(*) AS n FROM CURATED.DETAIL;")
+    (sql_folder / "C_OTHER.SQL").write_text("CREATE OR REPLACE TABLE CURATED.OTHER AS SELECT 1 AS one;")
+    conn = duckdb.connect()
+    conn.execute("CREATE SCHEMA STAGED; CREATE SCHEMA CURATED")
+    conn.execute("CREATE TABLE STAGED.SOURCE AS SELECT range AS id FROM range(5)")
+    logger = logger_setup("test_transform.log")
+    sync_tables(conn, logger, str(sql_folder), schema="CURATED", mode="transform")
+    assert sync_tables(conn, logger, str(sql_folder), schema="CURATED", mode="transform", changed_tables=[]) == []
+    state = conn.execute("SELECT target, length(sql_hash) FROM CURATED.MODEL_STATE ORDER BY target").fetchall()
+    assert state == [("CURATED.DETAIL", 64), ("CURATED.OTHER", 64), ("CURATED.SUMMARY", 64)]
+    assert not conn.execute("SELECT COUNT(*) FROM information_schema.tables WHERE table_name = 'INGEST_STATE'").fetchone()[0]
+
+    (sql_folder / "A_DETAIL.SQL").write_text("CREATE OR REPLACE TABLE CURATED.DETAIL AS SELECT id FROM STAGED.SOURCE WHERE id < 2;")
+    refreshed = sync_tables(conn, logger, str(sql_folder), schema="CURATED", mode="transform", changed_tables=[])
+    assert refreshed == ["CURATED.DETAIL", "CURATED.SUMMARY"]
+    assert conn.execute("SELECT n FROM CURATED.SUMMARY").fetchone()[0] == 2
+    assert sync_tables(conn, logger, str(sql_folder), schema="CURATED", mode="transform", changed_tables=[]) == []
+
+def test_sync_tables_transform_detects_cycles(tmp_path):
+    from src.utilities import sync_tables
+    from src.logger import logger_setup
+    sql_folder = tmp_path / "staged"
+    sql_folder.mkdir()
+    (sql_folder / "A.SQL").write_text("CREATE OR REPLACE TABLE STAGED.A AS SELECT * FROM STAGED.B;")
+    (sql_folder / "B.SQL").write_text("CREATE OR REPLACE TABLE STAGED.B AS SELECT * FROM STAGED.A;")
+    conn = duckdb.connect()
+    with pytest.raises(ValueError):
+        sync_tables(conn, logger_setup("test_transform.log"), str(sql_folder), schema="STAGED", mode="transform")
+
+def test_incremental_model_merges_latest_partition(tmp_path):
+    from src.utilities import sync_tables
+    from src.logger import logger_setup
+    sql_folder = tmp_path / "curated"
+    sql_folder.mkdir()
+    (sql_folder / "USAGE_SUM.SQL").write_text(
+        "-- materialized: incremental\n"
+        "-- unique_key: park_id, Year\n"
+        "-- change_column: Year\n"
+        "CREATE OR REPLACE TABLE CURATED.USAGE_SUM AS\n"
+        "SELECT park_id, Year, SUM(visits) AS total_visits FROM STAGED.USAGE GROUP BY park_id, Year;"
+    )
+    conn = duckdb.connect()
+    conn.execute("CREATE SCHEMA STAGED; CREATE SCHEMA CURATED")
+    conn.execute("CREATE TABLE STAGED.USAGE (park_id VARCHAR, Year INTEGER, Month INTEGER, visits BIGINT)")
+    conn.execute("INSERT INTO STAGED.USAGE VALUES ('p1', 2023, 1, 10), ('p1', 2024, 1, 5), ('p2', 2024, 1, 7)")
+    logger = logger_setup("test_transform.log")
+    sync_tables(conn, logger, str(sql_folder), schema="CURATED", mode="transform")
+
+    conn.execute("INSERT INTO STAGED.USAGE VALUES ('p1', 2024, 2, 3), ('p2', 2025, 1, 1)")
+    conn.execute("UPDATE STAGED.USAGE SET visits = 99 WHERE Year = 2023")
+    sync_tables(conn, logger, str(sql_folder), schema="CURATED", mode="transform")
+
+    rows = conn.execute("SELECT park_id, Year, total_visits FROM CURATED.USAGE_SUM ORDER BY park_id, Year").fetchall()
+    assert rows == [("p1", 2023, 10), ("p1", 2024, 8), ("p2", 2024, 7), ("p2", 2025, 1)]
+
+    (sql_folder / "USAGE_SUM.SQL").write_text(
+        "-- materialized: incremental\n"
+        "-- unique_key: park_id, Year\n"
+        "-- change_column: Year\n"
+        "CREATE OR REPLACE TABLE CURATED.USAGE_SUM AS\n"
+        "SELECT park_id, Year, SUM(visits) * 100 AS total_visits FROM STAGED.USAGE GROUP BY park_id, Year;"
+    )
+    sync_tables(conn, logger, str(sql_folder), schema="CURATED", mode="transform", changed_tables=[])
+    rows = conn.execute("SELECT park_id, Year, total_visits FROM CURATED.USAGE_SUM ORDER BY park_id, Year").fetchall()
+    assert rows == [("p1", 2023, 9900), ("p1", 2024, 800), ("p2", 2024, 700), ("p2", 2025, 100)]
+
+def test_landmark_geocoding_is_deterministic():
+    conn = duckdb.connect()
+    conn.execute("CREATE SCHEMA STAGED")
+    conn.execute("CREATE SCHEMA CURATED")
+    for model in ["STATE_ABBREVIATIONS", "STATE_COORDINATES", "CITY_COORDINATES"]:
+        with open(f"sql/staged/{model}.SQL") as f:
+            conn.execute(f.read())
+    conn.execute("""
+        CREATE TABLE STAGED.NATL_LANDMARKS AS
+        SELECT * FROM (VALUES (1, 'Chicago', 'Illinois'), (2, 'Springfield', 'Illinois'), (3, 'Cody', 'Wyoming'), (4, NULL, 'Not Listed')) t(id, city, state)
+    """)
+    with open("sql/curated/NATL_LANDMARKS.SQL") as f:
+        sql = f.read()
+    conn.execute(sql)
+    first = conn.execute("SELECT id, latitude, longitude FROM CURATED.NATL_LANDMARKS ORDER BY id").fetchall()
+    conn.execute(sql)
+    assert conn.execute("SELECT id, latitude, longitude FROM CURATED.NATL_LANDMARKS ORDER BY id").fetchall() == first
+    assert first[0][1:] == (41.8781, -87.6298)
+    assert abs(first[1][1] - 40.349457) <= 0.2 and abs(first[1][2] + 88.986137) <= 0.2
+    assert abs(first[2][1] - 42.755966) <= 0.2 and abs(first[2][2] + 107.302490) <= 0.2
+    assert first[3][1:] == (None, None)
+    precision = conn.execute("SELECT geocode_precision FROM CURATED.NATL_LANDMARKS ORDER BY id").fetchall()
+    assert precision == [("city",), ("state",), ("state",), (None,)]
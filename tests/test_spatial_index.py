@@ -0,0 +1,43 @@
+import random
+from src.spatial_index import SpatialIndex, haversine_miles
+
+def make_points(n=2000, seed=7):
+    rng = random.Random(seed)
+    return [
+        {"id": str(i), "latitude": rng.uniform(-60, 70), "longitude": rng.uniform(-180, 180)}
+        for i in range(n)
+    ]
+
+def brute_force(points, lat, lon, radius):
+    matches = []
+    for p in points:
+        d = float(haversine_miles(lat, lon, [p["latitude"]], [p["longitude"]])[0])
+        if d <= radius:
+            matches.append((d, p["id"]))
+    return sorted(matches)
+
+def test_within_matches_brute_force():
+    points = make_points()
+    index = SpatialIndex(points)
+    for lat, lon, radius in [(44.4, -110.6, 300), (0, 179.5, 500), (65, -150, 1200), (-30, 20, 50)]:
+        expected = brute_force(points, lat, lon, radius)
+        found = [(d, r["id"]) for r, d in index.within(lat, lon, radius)]
+        assert [i for _, i in found] == [i for _, i in expected]
+
+def test_nearest_returns_k_closest():
+    points = make_points()
+    index = SpatialIndex(points)
+    expected = brute_force(points, 10, 10, 20000)[:5]
+    found = index.nearest(10, 10, 5)
+    assert [r["id"] for r, _ in found] == [i for _, i in expected]
+    assert index.nearest(10, 10, 5, max_radius_miles=1) == [r for r in index.within(10, 10, 1)][:5]
+
+def test_skips_records_without_coordinates():
+    index = SpatialIndex([
+        {"id": "a", "latitude": 40.0, "longitude": -105.0},
+        {"id": "b", "latitude": None, "longitude": -105.0},
+        {"id": "c", "latitude": float("nan"), "longitude": 1.0},
+    ])
+    assert len(index) == 1
+    assert [r["id"] for r, _ in index.within(40.0, -105.0, 1)] == ["a"]
+    assert SpatialIndex([]).within(0, 0, 100) == []
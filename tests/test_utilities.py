@@ -41,3 +41,24 @@ def test_convert_json_to_parquet_empty():
 def test_duckdb_setup_error(mock_connect):
     with pytest.raises(Exception):
         utilities.duckdb_setup()
+
+def test_fetch_all_nps_data_concurrent_preserves_order(monkeypatch):
+    class DummyResponse:
+        def __init__(self, start):
+            self.start = start
+        def json(self):
+            records = [{"id": i} for i in range(self.start, min(self.start + 50, 120))]
+            return {"data": records, "total": "120"}
+        def raise_for_status(self):
+            pass
+    class DummySession:
+        def __init__(self):
+            self.starts = []
+        def get(self, url, params):
+            self.starts.append(params["start"])
+            return DummyResponse(params["start"])
+    session = DummySession()
+    monkeypatch.setattr(utilities, "get_nps_session", lambda: session)
+    result = utilities.fetch_all_nps_data("fake_key", "http://fakeurl", concurrent=True, max_workers=4)
+    assert [r["id"] for r in result] == list(range(120))
+    assert sorted(session.starts) == [0, 50, 100]